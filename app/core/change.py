@@ -0,0 +1,113 @@
+"""
+Module with the change-making engine.
+"""
+from functools import reduce
+from math import gcd
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import get_app_settings
+from app.core.constants import ALLOWED_CENT_COINS
+
+
+class ChangeMaker:
+    """
+    Pays an amount of cents with the minimum number of coins.
+
+    The minimum coin counts of every amount up to `max_amount` are precomputed once with dynamic programming,
+    so unlimited supply requests are answered in O(number of denominations). Requests with a limited coin
+    supply fall back to a bounded dynamic programming search when the precomputed answer doesn't fit the supply,
+    its cost is bounded by `max_amount` too. Amounts above `max_amount` are never paid.
+    """
+
+    def __init__(self, denominations: Sequence[int], max_amount: int) -> None:
+        self.denominations = sorted(denominations)
+        # Amounts are handled in units of the smallest common step of the coins, e.g. 5 cents
+        self.unit = reduce(gcd, self.denominations)
+        self.max_amount = max_amount - max_amount % self.unit
+        self._table = self._build_table(self.max_amount // self.unit)
+
+    def _build_table(self, max_units: int) -> List[Optional[Tuple[int, ...]]]:
+        """
+        Return coin counts (one per denomination) of the minimum coin change of every amount in units.
+        """
+        coin_units = [coin // self.unit for coin in self.denominations]
+        best_count: List[Optional[int]] = [0] + [None] * max_units
+        last_coin: List[int] = [0] * (max_units + 1)
+        for amount in range(1, max_units + 1):
+            for index, coin in enumerate(coin_units):
+                if coin <= amount and best_count[amount - coin] is not None and (
+                        best_count[amount] is None or best_count[amount - coin] + 1 < best_count[amount]):
+                    best_count[amount] = best_count[amount - coin] + 1
+                    last_coin[amount] = index
+        table: List[Optional[Tuple[int, ...]]] = [tuple(0 for _ in coin_units)]
+        for amount in range(1, max_units + 1):
+            if best_count[amount] is None:
+                table.append(None)
+                continue
+            counts = list(table[amount - coin_units[last_coin[amount]]])
+            counts[last_coin[amount]] += 1
+            table.append(tuple(counts))
+        return table
+
+    def make_change(self, amount: int, supply: Optional[Dict[int, int]] = None) -> Optional[Dict[int, int]]:
+        """
+        Return coin value to quantity map paying `amount` cents with the minimum number of coins,
+        or `None` when the amount can't be paid exactly (with the given coin `supply`) or is above `max_amount`.
+        :param amount: amount in integer cents
+        :param supply: available quantity per coin value, unlimited when not passed
+        :return:
+        """
+        if amount < 0 or amount % self.unit or amount > self.max_amount:
+            return None
+        change = self._lookup(amount)
+        if change is None or supply is None:
+            return change
+        if all(quantity <= supply.get(coin, 0) for coin, quantity in change.items()):
+            return change
+        return self._make_bounded_change(amount, supply)
+
+    def _lookup(self, amount: int) -> Optional[Dict[int, int]]:
+        counts = self._table[amount // self.unit]
+        if counts is None:
+            return None
+        return {coin: quantity for coin, quantity in zip(self.denominations, counts) if quantity}
+
+    def _make_bounded_change(self, amount: int, supply: Dict[int, int]) -> Optional[Dict[int, int]]:
+        """
+        Bounded change-making: coin quantities are split into powers of two and solved as 0/1 knapsack
+        over amounts in units, O(amount * sum(log(quantity))).
+        """
+        units = amount // self.unit
+        items: List[Tuple[int, int]] = []
+        for coin in self.denominations:
+            remaining = min(supply.get(coin, 0), units // (coin // self.unit))
+            chunk = 1
+            while remaining > 0:
+                quantity = min(chunk, remaining)
+                items.append((coin, quantity))
+                remaining -= quantity
+                chunk *= 2
+        best_count: List[Optional[int]] = [0] + [None] * units
+        taken: List[bytearray] = []
+        for coin, quantity in items:
+            weight = quantity * coin // self.unit
+            item_taken = bytearray(units + 1)
+            for value in range(units, weight - 1, -1):
+                previous = best_count[value - weight]
+                if previous is not None and (best_count[value] is None or previous + quantity < best_count[value]):
+                    best_count[value] = previous + quantity
+                    item_taken[value] = 1
+            taken.append(item_taken)
+        if best_count[units] is None:
+            return None
+        change: Dict[int, int] = {}
+        value = units
+        for (coin, quantity), item_taken in zip(reversed(items), reversed(taken)):
+            if item_taken[value]:
+                change[coin] = change.get(coin, 0) + quantity
+                value -= quantity * coin // self.unit
+        return change
+
+
+# Minimum coin change table of the machine coins, built once at startup
+change_maker = ChangeMaker(ALLOWED_CENT_COINS, get_app_settings().change_table_max_cents)
@@ -1,7 +1,9 @@
 from app.core.user_roles_enum import UserRoles
 
-ALLOWED_USER_ROLES = [role.value for role in UserRoles]
+ALLOWED_USER_ROLES = [role.role_name for role in UserRoles]
 ALLOWED_CENT_COINS = [5, 10, 20, 50, 100]
+# Highest product price in dollars, keeps `price_cents` far below the BIGINT range
+MAX_PRODUCT_PRICE = 1_000_000
 
 # JWT token related
 ACCESS_TOKEN_EXPIRE_MINUTES = 3600
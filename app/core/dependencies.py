@@ -17,7 +17,7 @@ basic_security = HTTPBasic()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
-def get_current_user(
+async def get_current_user(
         user_service: UserService = Depends(),
         token: str = Depends(oauth2_scheme)
 ) -> Users:
@@ -34,7 +34,7 @@ def get_current_user(
     except jwt.exceptions.PyJWTError:
         raise InvalidUserCredentialsException(message="Invalid Credentials. Please try again!",
                                               status_code=status.HTTP_401_UNAUTHORIZED)
-    user = user_service.user_repo.get_by_username(username=token_data.username)
+    user = await user_service.user_repo.get_authenticated_by_username(username=token_data.username)
     if not user or user.disabled:
         raise InvalidUserCredentialsException(
             message="Invalid Credentials. Please try again!",
@@ -43,14 +43,14 @@ def get_current_user(
     return user
 
 
-def get_current_product(product_id: int,
+async def get_current_product(product_id: int,
                         products_repo: ProductsRepository = Depends(get_products_repository),
                         current_user: Users = Depends(get_current_user)) -> Products:
     """
     Return current product
     :return:
     """
-    product = products_repo.get(product_id)
+    product = await products_repo.get(product_id)
     if not product or not product.is_active:
         raise ProductNotFoundException(
             message=f"Product with id `{product_id}` not found",
@@ -63,7 +63,7 @@ def get_current_product(product_id: int,
     return product
 
 
-def get_current_deposit(current_user: Users = Depends(get_current_user),
+async def get_current_deposit(current_user: Users = Depends(get_current_user),
                         deposits_repo: DepositsRepository = Depends(get_deposits_repository)) -> Deposits:
     """
     Returns current not utilized deposit of current user.
@@ -71,7 +71,7 @@ def get_current_deposit(current_user: Users = Depends(get_current_user),
     :param deposits_repo:
     :return:
     """
-    deposit = deposits_repo.get_not_utilized_deposits_by_user(current_user.id)
+    deposit = await deposits_repo.get_not_utilized_deposits_by_user(current_user.id)
     if not deposit:
         raise DepositsNotExistsException(message="Deposits not found", status_code=status.HTTP_404_NOT_FOUND)
     return deposit
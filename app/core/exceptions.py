@@ -11,6 +11,8 @@ from starlette.status import (
     HTTP_500_INTERNAL_SERVER_ERROR,
 )
 
+from app.core.metrics import EXCEPTIONS
+
 
 def form_error_message(errors: List[dict]) -> List[str]:
     """
@@ -111,6 +113,12 @@ class DepositsNotExistsException(BaseInternalException):
     """
 
 
+class ExactChangeNotAvailableException(BaseInternalException):
+    """
+    Exception raised when the machine coins can't pay the exact change of a purchase
+    """
+
+
 def add_internal_exception_handler(app: FastAPI) -> None:
     """
     Handle all internal exceptions.
@@ -120,6 +128,7 @@ def add_internal_exception_handler(app: FastAPI) -> None:
     async def _exception_handler(
             _: Request, exc: BaseInternalException
     ) -> JSONResponse:
+        EXCEPTIONS.labels(type(exc).__name__, str(exc.status_code)).inc()
         return JSONResponse(
             status_code=exc.status_code,
             content={
@@ -196,6 +205,7 @@ def add_internal_server_error_handler(app: FastAPI) -> None:
 
     @app.exception_handler(Exception)
     async def _exception_handler(_: Request, exc: Exception) -> JSONResponse:
+        EXCEPTIONS.labels(type(exc).__name__, str(HTTPStatus.INTERNAL_SERVER_ERROR.value)).inc()
         return JSONResponse(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             content={
@@ -0,0 +1,80 @@
+"""
+Module with Prometheus metrics of the application.
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+from app.core.cache import LRUCache
+
+# Label of requests which didn't match any route, keeps the label cardinality bounded
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route template",
+                            ["method", "route"])
+RESPONSES = Counter("http_responses", "HTTP responses by route template and status code",
+                    ["method", "route", "status"])
+EXCEPTIONS = Counter("app_exceptions", "Exceptions turned into error responses by type and status code",
+                     ["type", "status"])
+PASSWORD_HASHING_TIME = Histogram("password_hashing_duration_seconds", "Time spent in bcrypt by operation",
+                                  ["operation"], buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+POOL_GAUGES = {
+    "size": "Connections kept open by the database pool",
+    "checked_in": "Idle connections in the database pool",
+    "checked_out": "Database connections in use",
+    "overflow": "Database connections opened above the pool size",
+}
+CACHE_GAUGES = {
+    "size": "Entries in the in-process cache",
+    "maxsize": "Maximum entries of the in-process cache",
+    "hit_ratio": "Share of in-process cache lookups which were hits",
+}
+CACHE_COUNTERS = {
+    "hits": "In-process cache hits",
+    "misses": "In-process cache misses",
+    "evictions": "Entries evicted from the in-process cache because of its size",
+    "expirations": "Entries expired in the in-process cache",
+}
+
+
+class RuntimeStatsCollector(Collector):
+    """
+    Collect database pool and in-process cache statistics at scrape time.
+    """
+
+    def __init__(self, get_pool_status: Callable[[], Dict[str, Any]], caches: Iterable[LRUCache]) -> None:
+        self.get_pool_status = get_pool_status
+        self.caches = list(caches)
+
+    def collect(self) -> Iterator[Metric]:
+        yield from self.collect_pool()
+        yield from self.collect_caches()
+
+    def collect_pool(self) -> Iterator[Metric]:
+        pool_status = self.get_pool_status()
+        # Pools other than `InstrumentedQueuePool` only report their name
+        if "size" not in pool_status:
+            return
+        for key, documentation in POOL_GAUGES.items():
+            yield GaugeMetricFamily(f"db_pool_{key}", documentation, value=pool_status[key])
+        yield CounterMetricFamily("db_pool_checkouts", "Database pool connection checkouts",
+                                  value=pool_status["checkouts"])
+        yield CounterMetricFamily("db_pool_checkout_seconds", "Time spent checking out pooled connections",
+                                  value=pool_status["checkout_time_total"])
+        yield GaugeMetricFamily("db_pool_checkout_seconds_max", "Longest checkout of a pooled connection",
+                                value=pool_status["checkout_time_max"])
+
+    def collect_caches(self) -> Iterator[Metric]:
+        gauges = {key: GaugeMetricFamily(f"cache_{key}", documentation, labels=["cache"])
+                  for key, documentation in CACHE_GAUGES.items()}
+        counters = {key: CounterMetricFamily(f"cache_{key}", documentation, labels=["cache"])
+                    for key, documentation in CACHE_COUNTERS.items()}
+        for cache in self.caches:
+            stats = cache.stats()
+            for key, metric in {**gauges, **counters}.items():
+                metric.add_metric([cache.name], stats[key])
+        yield from gauges.values()
+        yield from counters.values()
@@ -0,0 +1,73 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logging import logger
+from app.core.metrics import REQUEST_LATENCY, RESPONSES, UNMATCHED_ROUTE
+from app.db.query_stats import QueryStats, request_query_stats
+
+
+class QueryStatsMiddleware:
+    """
+    Count database statements and time of every request, report them in the `Server-Timing` header
+    and log a warning when a route issues more statements than `query_budget`.
+    """
+
+    def __init__(self, app: ASGIApp, query_budget: int) -> None:
+        self.app = app
+        self.query_budget = query_budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats()
+        token = request_query_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_server_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            request_query_stats.reset(token)
+            if stats.query_count > self.query_budget:
+                route = scope.get("route")
+                logger.warning(f"{scope['method']} {getattr(route, 'path', scope['path'])} issued "
+                               f"{stats.query_count} queries ({stats.duration * 1000:.1f} ms), "
+                               f"budget is {self.query_budget}")
+
+
+class MetricsMiddleware:
+    """
+    Record latency and status code of every request by method and route template.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        # Unhandled exceptions are turned into 500 responses by the outermost middleware
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            REQUEST_LATENCY.labels(scope["method"], route).observe(time.perf_counter() - started)
+            RESPONSES.labels(scope["method"], route, str(status_code)).inc()
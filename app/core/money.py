@@ -0,0 +1,17 @@
+"""
+Module with money conversions. Money is kept as integer cents and converted to dollars only at the API boundary.
+"""
+
+
+def to_cents(dollars: float) -> int:
+    """
+    Convert dollars with at most two decimal places to integer cents.
+    """
+    return round(dollars * 100)
+
+
+def to_dollars(cents: int) -> float:
+    """
+    Convert integer cents to dollars.
+    """
+    return cents / 100
@@ -1,21 +1,65 @@
+import base64
+import binascii
+import json
+from datetime import datetime
 from enum import Enum
+from typing import Optional
 
-from fastapi import Query
+from fastapi import Query, status
 from pydantic import BaseModel
 
+from app.core.exceptions import InvalidInputDataException
+
 
 class SortEnum(Enum):
     ASCENDING = "asc"
     DESCENDING = "desc"
 
 
+class CursorDirectionEnum(Enum):
+    NEXT = "next"
+    PREVIOUS = "prev"
+
+
+class Cursor(BaseModel):
+    created_time: datetime
+    id: int
+    direction: CursorDirectionEnum = CursorDirectionEnum.NEXT
+
+
 class Pagination(BaseModel):
     page: int
     per_page: int
     order: SortEnum
+    cursor: Optional[Cursor] = None
+
+
+def encode_cursor(created_time: datetime, obj_id: int, direction: CursorDirectionEnum) -> str:
+    """
+    Return opaque cursor pointing at the given `(created_time, id)` position.
+    """
+    payload = json.dumps([created_time.isoformat(), obj_id, direction.value], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Parse opaque cursor created by `encode_cursor`.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_time, obj_id, direction = json.loads(payload)
+        return Cursor(created_time=created_time, id=obj_id, direction=direction)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidInputDataException(message="Invalid pagination cursor", status_code=status.HTTP_400_BAD_REQUEST)
 
 
 def pagination_params(page: int = Query(default=1, ge=1, required=False),
                       per_page: int = Query(default=100, ge=1, le=100, required=False),
-                      order: SortEnum = SortEnum.DESCENDING) -> Pagination:
-    return Pagination(page=page, per_page=per_page, order=order)
+                      order: SortEnum = SortEnum.DESCENDING,
+                      cursor: Optional[str] = Query(default=None, required=False,
+                                                    description="Opaque cursor from `next_cursor` or "
+                                                                "`previous_cursor`, `page` is ignored when set")
+                      ) -> Pagination:
+    return Pagination(page=page, per_page=per_page, order=order,
+                      cursor=decode_cursor(cursor) if cursor else None)
@@ -1,22 +1,63 @@
+import asyncio
 import base64
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.config import get_app_settings
+from app.core.metrics import PASSWORD_HASHING_TIME
+
+settings = get_app_settings()
+
+# Hashes with a different cost than `bcrypt_rounds` are reported for update on successful verification
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop and bounds its concurrency
+password_hashing_executor = ThreadPoolExecutor(max_workers=settings.password_hashing_workers,
+                                               thread_name_prefix="password-hashing")
 
 
 def get_password_hash(password: str) -> str:
     """
     Convert user password to hash string.
     """
-    return pwd_context.hash(secret=password)
+    with PASSWORD_HASHING_TIME.labels("hash").time():
+        return pwd_context.hash(secret=password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Check if the user password from request is valid.
     """
-    return pwd_context.verify(secret=plain_password, hash=hashed_password)
+    with PASSWORD_HASHING_TIME.labels("verify").time():
+        return pwd_context.verify(secret=plain_password, hash=hashed_password)
+
+
+def verify_and_update_password_hash(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check the user password and return a new hash when the stored one uses an outdated cost.
+    """
+    with PASSWORD_HASHING_TIME.labels("verify").time():
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    """
+    Convert user password to hash string in the password hashing thread pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_hashing_executor, get_password_hash, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check the user password in the password hashing thread pool.
+    Returns if the password is valid and a new hash when the stored one uses an outdated cost.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_hashing_executor, verify_and_update_password_hash,
+                                      plain_password, hashed_password)
 
 
 def get_basic_auth_token(username: str, password: str) -> str:
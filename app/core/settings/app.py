@@ -37,6 +37,27 @@ class AppSettings(BaseAppSettings):
     postgres_password: str
     min_connection_count: int = 5
     max_connection_count: int = 10
+    connection_timeout: float = 30.0
+    connection_recycle_seconds: int = 1800
+    connection_pre_ping: bool = True
+    database_echo: bool = False
+    slow_query_threshold_ms: float = 200.0
+    query_log_sample_rate: int = 0
+    request_query_budget: int = 15
+
+    bcrypt_rounds: int = 12
+    password_hashing_workers: int = 4
+
+    product_cache_size: int = 1024
+    product_cache_ttl_seconds: float = 60.0
+    user_cache_size: int = 4096
+    user_cache_ttl_seconds: float = 30.0
+
+    product_import_chunk_size: int = 1000
+    product_import_max_errors: int = 100
+    purchases_export_batch_size: int = 1000
+
+    change_table_max_cents: int = 10000
     model_config = ConfigDict(validate_assignment=True)
 
     @property
@@ -50,3 +71,13 @@ class AppSettings(BaseAppSettings):
             "title": self.title,
             "version": self.version,
         }
+
+    @property
+    def database_pool_kwargs(self) -> Dict[str, Any]:
+        return {
+            "pool_size": self.min_connection_count,
+            "max_overflow": max(self.max_connection_count - self.min_connection_count, 0),
+            "pool_timeout": self.connection_timeout,
+            "pool_recycle": self.connection_recycle_seconds,
+            "pool_pre_ping": self.connection_pre_ping,
+        }
@@ -1,6 +1,27 @@
-from enum import Enum
+from enum import IntFlag
+from typing import Iterable, List
 
 
-class UserRoles(Enum):
-    SELLER_ROLE = "seller"
-    BUYER_ROLE = "buyer"
+class UserRoles(IntFlag):
+    """
+    User roles stored together as an integer bitmask.
+    """
+    BUYER_ROLE = 1
+    SELLER_ROLE = 2
+
+    @property
+    def role_name(self) -> str:
+        """
+        API name of a single role, e.g. `seller`.
+        """
+        return self.name.removesuffix("_ROLE").lower()
+
+    def to_role_names(self) -> List[str]:
+        return [role.role_name for role in UserRoles if role in self]
+
+    @classmethod
+    def from_role_names(cls, role_names: Iterable[str]) -> "UserRoles":
+        roles = cls(0)
+        for role_name in role_names:
+            roles |= cls[f"{role_name.upper()}_ROLE"]
+        return roles
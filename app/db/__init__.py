@@ -2,3 +2,6 @@ from app.models.users import Users
 from app.models.products import Products
 from app.models.deposits import Deposits
 from app.models.purchases import Purchases
+from app.models.counters import Counters
+from app.models.sales import Sales
+from app.models.coins import Coins
@@ -0,0 +1,136 @@
+"""
+Versioned schema migrations for PostgreSQL.
+
+Migrations are the `NNNN_<name>.sql` files of `app/db/migrations`, applied in version order and recorded in
+the `schema_migrations` table. Every migration runs in its own transaction, except files starting with the
+`-- migrate: no-transaction` line: their statements run one by one outside of a transaction, which is required
+by online operations like `CREATE INDEX CONCURRENTLY`. The version is recorded only after all of them succeed,
+so such statements are re-run after a failure and must be idempotent. `IF NOT EXISTS` alone isn't enough for
+`CREATE INDEX CONCURRENTLY`: a failed build leaves an invalid index behind, so indexes of the migration which are
+invalid are dropped before its statements run, and the version isn't recorded while any of them is invalid.
+
+Run with `python -m app.db.migrate`.
+"""
+import asyncio
+import re
+from pathlib import Path
+from typing import List, Tuple
+
+import asyncpg
+from sqlalchemy import make_url
+
+from app.core.config import get_app_settings
+from app.core.logging import logger
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+# Serializes concurrent runs, e.g. several application containers starting together
+MIGRATIONS_LOCK_ID = 4_826_193
+
+CONCURRENT_INDEX_PATTERN = re.compile(r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)",
+                                      re.IGNORECASE)
+INVALID_INDEXES_QUERY = """
+SELECT index_class.relname FROM pg_index JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+WHERE NOT pg_index.indisvalid AND pg_table_is_visible(index_class.oid) AND index_class.relname = ANY($1::text[])
+"""
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(255) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def get_migrations() -> List[Tuple[str, str, Path]]:
+    """
+    Return `(version, name, path)` of all migrations ordered by version.
+    """
+    migrations = []
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        version, _, name = path.stem.partition("_")
+        migrations.append((version, name, path))
+    return migrations
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Split a no-transaction migration into statements. Comment lines are dropped and statements are separated
+    by `;`, so these migrations can't use semicolons inside statements.
+    """
+    lines = [line for line in sql.splitlines() if not line.lstrip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+async def get_invalid_indexes(connection: asyncpg.Connection, index_names: List[str]) -> List[str]:
+    """
+    Return which of the indexes are invalid, e.g. left behind by a failed `CREATE INDEX CONCURRENTLY`.
+    """
+    if not index_names:
+        return []
+    return [record["relname"] for record in await connection.fetch(INVALID_INDEXES_QUERY, index_names)]
+
+
+async def apply_migration(connection: asyncpg.Connection, version: str, name: str, sql: str) -> None:
+    record_query = "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)"
+    if sql.startswith(NO_TRANSACTION_MARKER):
+        statements = split_statements(sql)
+        index_names = [match for statement in statements for match in CONCURRENT_INDEX_PATTERN.findall(statement)]
+        for index_name in await get_invalid_indexes(connection, index_names):
+            logger.warning(f"Dropping invalid index {index_name} left by a failed run of migration {version}")
+            await connection.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}"')
+        for statement in statements:
+            await connection.execute(statement)
+        invalid_indexes = await get_invalid_indexes(connection, index_names)
+        if invalid_indexes:
+            raise RuntimeError(f"Migration {version} left invalid indexes: {', '.join(invalid_indexes)}")
+        await connection.execute(record_query, version, name)
+        return
+    async with connection.transaction():
+        await connection.execute(sql)
+        await connection.execute(record_query, version, name)
+
+
+async def baseline_existing_schema(connection: asyncpg.Connection) -> None:
+    """
+    Record the initial schema as applied on databases created by the former `init.sql` script.
+    """
+    if await connection.fetchval("SELECT count(*) FROM schema_migrations"):
+        return
+    if await connection.fetchval("SELECT to_regclass('users') IS NOT NULL"):
+        version, name, _ = get_migrations()[0]
+        logger.info(f"Existing schema recorded as migration {version}: {name}")
+        await connection.execute("INSERT INTO schema_migrations (version, name) VALUES ($1, $2)", version, name)
+
+
+async def run_migrations(database_url: str) -> List[str]:
+    """
+    Apply all migrations missing in the database.
+    :return: applied versions
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() != "postgresql":
+        raise ValueError("Schema migrations are written for PostgreSQL only")
+    connection = await asyncpg.connect(url.set(drivername="postgresql").render_as_string(hide_password=False))
+    try:
+        await connection.execute("SELECT pg_advisory_lock($1)", MIGRATIONS_LOCK_ID)
+        await connection.execute(CREATE_MIGRATIONS_TABLE)
+        await baseline_existing_schema(connection)
+        records = await connection.fetch("SELECT version FROM schema_migrations")
+        applied_versions = {record["version"] for record in records}
+        applied_now = []
+        for version, name, path in get_migrations():
+            if version in applied_versions:
+                continue
+            logger.info(f"Applying migration {version}: {name}")
+            await apply_migration(connection, version, name, path.read_text())
+            applied_now.append(version)
+        return applied_now
+    finally:
+        await connection.close()
+
+
+if __name__ == "__main__":
+    applied = asyncio.run(run_migrations(get_app_settings().database_url))
+    logger.info(f"Applied {len(applied)} migrations" if applied else "Database schema is up to date")
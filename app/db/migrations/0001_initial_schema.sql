@@ -1,3 +1,4 @@
+-- Schema of the first release, previously created by PostgresqlApp/init.sql
 CREATE TABLE users (
     id SERIAL PRIMARY KEY,
     username VARCHAR(255) UNIQUE NOT NULL,
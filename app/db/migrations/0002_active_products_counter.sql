@@ -0,0 +1,10 @@
+-- Maintained count of active products and the index backing keyset pagination of the catalog
+CREATE TABLE counters (
+    name VARCHAR(255) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO counters (name, value) SELECT 'active_products', count(*) FROM products WHERE is_active;
+
+CREATE INDEX ix_products_active_created_time_id ON products (is_active, created_time, id);
@@ -0,0 +1,18 @@
+-- Hourly units sold and revenue per product, backfilled from the purchases history.
+-- Buckets are UTC hours like the ones written by the application, `created_time` holds the session local time.
+CREATE TABLE sales (
+    product_id INTEGER REFERENCES products(id),
+    bucket_time TIMESTAMP NOT NULL,
+    units BIGINT NOT NULL DEFAULT 0,
+    revenue NUMERIC(15, 2) NOT NULL DEFAULT 0,
+    updated_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (product_id, bucket_time)
+);
+
+INSERT INTO sales (product_id, bucket_time, units, revenue)
+SELECT product_id,
+       date_trunc('hour', created_time AT TIME ZONE current_setting('TimeZone') AT TIME ZONE 'UTC') AS bucket_time,
+       sum(quantity), sum(total_spent)
+FROM purchases
+WHERE created_time IS NOT NULL
+GROUP BY product_id, bucket_time;
@@ -0,0 +1,14 @@
+-- Machine coin inventory, seeded with the coins of deposits which are still in the machine
+CREATE TABLE coins (
+    value INTEGER PRIMARY KEY,
+    quantity BIGINT NOT NULL DEFAULT 0,
+    updated_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO coins (value, quantity)
+SELECT coin_values.value, COALESCE(sum((coin ->> 'quantity')::int), 0)
+FROM (VALUES (5), (10), (20), (50), (100)) AS coin_values (value)
+LEFT JOIN (
+    SELECT jsonb_array_elements(coins::jsonb) AS coin FROM deposits WHERE NOT is_deposit_utilized
+) AS deposited ON (coin ->> 'value')::int = coin_values.value
+GROUP BY coin_values.value;
@@ -0,0 +1,12 @@
+-- Store money as integer cents
+ALTER TABLE products RENAME COLUMN price TO price_cents;
+ALTER TABLE products ALTER COLUMN price_cents TYPE BIGINT USING round(price_cents * 100);
+
+ALTER TABLE deposits RENAME COLUMN amount TO amount_cents;
+ALTER TABLE deposits ALTER COLUMN amount_cents TYPE BIGINT USING round(amount_cents * 100);
+
+ALTER TABLE purchases RENAME COLUMN total_spent TO total_spent_cents;
+ALTER TABLE purchases ALTER COLUMN total_spent_cents TYPE BIGINT USING round(total_spent_cents * 100);
+
+ALTER TABLE sales RENAME COLUMN revenue TO revenue_cents;
+ALTER TABLE sales ALTER COLUMN revenue_cents TYPE BIGINT USING round(revenue_cents * 100);
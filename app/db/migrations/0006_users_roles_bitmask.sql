@@ -0,0 +1,11 @@
+-- Convert users.roles from a JSON list of role names to the `UserRoles` bitmask (buyer = 1, seller = 2)
+ALTER TABLE users ADD COLUMN roles_mask INTEGER NOT NULL DEFAULT 1;
+
+UPDATE users SET roles_mask = (CASE WHEN roles LIKE '%buyer%' THEN 1 ELSE 0 END)
+                            | (CASE WHEN roles LIKE '%seller%' THEN 2 ELSE 0 END);
+
+ALTER TABLE users DROP COLUMN roles;
+ALTER TABLE users RENAME COLUMN roles_mask TO roles;
+
+CREATE INDEX ix_users_buyers ON users (id) WHERE roles & 1 <> 0;
+CREATE INDEX ix_users_sellers ON users (id) WHERE roles & 2 <> 0;
@@ -0,0 +1,27 @@
+-- Move deposits.coins from a JSON list of {"value", "quantity"} to one count column per coin value
+ALTER TABLE deposits
+    ADD COLUMN coins_5 INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN coins_10 INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN coins_20 INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN coins_50 INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN coins_100 INTEGER NOT NULL DEFAULT 0;
+
+UPDATE deposits SET
+    coins_5 = totals.coins_5,
+    coins_10 = totals.coins_10,
+    coins_20 = totals.coins_20,
+    coins_50 = totals.coins_50,
+    coins_100 = totals.coins_100
+FROM (
+    SELECT deposits.id,
+           COALESCE(SUM((coin ->> 'quantity')::int) FILTER (WHERE (coin ->> 'value')::int = 5), 0) AS coins_5,
+           COALESCE(SUM((coin ->> 'quantity')::int) FILTER (WHERE (coin ->> 'value')::int = 10), 0) AS coins_10,
+           COALESCE(SUM((coin ->> 'quantity')::int) FILTER (WHERE (coin ->> 'value')::int = 20), 0) AS coins_20,
+           COALESCE(SUM((coin ->> 'quantity')::int) FILTER (WHERE (coin ->> 'value')::int = 50), 0) AS coins_50,
+           COALESCE(SUM((coin ->> 'quantity')::int) FILTER (WHERE (coin ->> 'value')::int = 100), 0) AS coins_100
+    FROM deposits CROSS JOIN LATERAL jsonb_array_elements(deposits.coins::jsonb) AS coin
+    GROUP BY deposits.id
+) AS totals
+WHERE deposits.id = totals.id;
+
+ALTER TABLE deposits DROP COLUMN coins;
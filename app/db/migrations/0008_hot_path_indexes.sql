@@ -0,0 +1,13 @@
+-- migrate: no-transaction
+-- Indexes of the lookups run on every request, built without blocking writes on a live database
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_deposits_user_id_not_utilized ON deposits (user_id)
+    WHERE NOT is_deposit_utilized;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_deposits_user_id ON deposits (user_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_purchases_product_id ON purchases (product_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_purchases_deposit_id ON purchases (deposit_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_creator_id_active ON products (creator_id)
+    WHERE is_active;
@@ -0,0 +1,7 @@
+-- migrate: no-transaction
+-- Allow one not utilized deposit per user, replacing the plain index of the same lookup.
+-- Fails if a user already has several not utilized deposits, the invalid index left behind is dropped by the next run.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_deposits_user_id_not_utilized ON deposits (user_id)
+    WHERE NOT is_deposit_utilized;
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_deposits_user_id_not_utilized;
@@ -0,0 +1,48 @@
+import time
+from typing import Any, Dict
+
+from sqlalchemy import AsyncAdaptedQueuePool, Pool
+from sqlalchemy.pool import PoolProxiedConnection
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool which keeps track of how long callers take to check out a connection,
+    including the wait for a free connection, opening new ones and the pre-ping.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkout_count = 0
+        self.checkout_time_total = 0.0
+        self.checkout_time_max = 0.0
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            checkout_time = time.perf_counter() - started
+            self.checkout_count += 1
+            self.checkout_time_total += checkout_time
+            self.checkout_time_max = max(self.checkout_time_max, checkout_time)
+
+
+def get_pool_stats(pool: Pool) -> Dict[str, Any]:
+    """
+    Return live statistics of the connection pool.
+    """
+    if not isinstance(pool, InstrumentedQueuePool):
+        return {"pool": type(pool).__name__}
+    checkout_count = pool.checkout_count
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": checkout_count,
+        "checkout_time_total": round(pool.checkout_time_total, 6),
+        "checkout_time_avg": round(pool.checkout_time_total / checkout_count, 6) if checkout_count else 0.0,
+        "checkout_time_max": round(pool.checkout_time_max, 6),
+    }
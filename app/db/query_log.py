@@ -0,0 +1,92 @@
+import itertools
+import sys
+import time
+from types import FrameType
+from typing import Any, Iterator, Optional
+
+from greenlet import getcurrent
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import Connection
+
+from app.core.logging import logger
+
+QUERY_START_TIMES = "query_start_times"
+REPOSITORIES_PACKAGE = "app.db.repositories."
+
+
+def describe_parameters(parameters: Any, executemany: bool = False) -> str:
+    """
+    Return the shape of statement parameters without their values, e.g. `{id, name}`, `(3 values)`
+    or `100 x {id, name}` for executemany.
+    """
+    if executemany:
+        first = describe_parameters(parameters[0]) if parameters else "()"
+        return f"{len(parameters)} x {first}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(map(str, parameters)) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return f"({len(parameters)} values)"
+    return "()"
+
+
+def iter_caller_frames() -> Iterator[FrameType]:
+    """
+    Yield the frames of the current call stack. Async sessions run statements in a greenlet,
+    so the stack continues in the suspended parent greenlet which awaits the session call.
+    """
+    frame: Optional[FrameType] = sys._getframe(1)
+    current = getcurrent()
+    while frame is not None or current is not None:
+        while frame is not None:
+            yield frame
+            frame = frame.f_back
+        current = current.parent if current is not None else None
+        frame = current.gr_frame if current is not None else None
+
+
+def get_repository_caller() -> Optional[str]:
+    """
+    Return `module.Class.method` of the innermost repository method on the call stack.
+    """
+    for frame in iter_caller_frames():
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(REPOSITORIES_PACKAGE):
+            return f"{module}.{frame.f_code.co_qualname}"
+    return None
+
+
+def instrument_engine(engine: Engine, slow_query_threshold_ms: float, sample_rate: int) -> None:
+    """
+    Log statements slower than `slow_query_threshold_ms` as warnings and, when `sample_rate` is set,
+    every `sample_rate`-th statement with its duration. A threshold below zero disables the slow query log.
+    """
+    if slow_query_threshold_ms < 0 and sample_rate <= 0:
+        return
+    statement_counter = itertools.count(1)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query_timer(conn: Connection, cursor: Any, statement: str, parameters: Any, context: Any,
+                           executemany: bool) -> None:
+        conn.info.setdefault(QUERY_START_TIMES, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _log_query(conn: Connection, cursor: Any, statement: str, parameters: Any, context: Any,
+                   executemany: bool) -> None:
+        duration_ms = (time.perf_counter() - conn.info[QUERY_START_TIMES].pop()) * 1000
+        is_slow = 0 <= slow_query_threshold_ms <= duration_ms
+        is_sampled = sample_rate > 0 and next(statement_counter) % sample_rate == 0
+        if not is_slow and not is_sampled:
+            return
+        message = (f"{'Slow query' if is_slow else 'Sampled query'} took {duration_ms:.1f} ms "
+                   f"in {get_repository_caller() or 'unknown caller'}, "
+                   f"parameters: {describe_parameters(parameters, executemany)}, statement: {statement}")
+        if is_slow:
+            logger.warning(message)
+        else:
+            logger.info(message)
+
+    @event.listens_for(engine, "handle_error")
+    def _discard_query_timer(exception_context: Any) -> None:
+        connection = exception_context.connection
+        if connection is not None and connection.info.get(QUERY_START_TIMES):
+            connection.info[QUERY_START_TIMES].pop()
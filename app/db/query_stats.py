@@ -0,0 +1,52 @@
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import Connection
+
+QUERY_STATS_START_TIMES = "query_stats_start_times"
+
+
+class QueryStats:
+    """
+    Number of statements and database time spent by one request.
+    """
+
+    def __init__(self) -> None:
+        self.query_count = 0
+        self.duration = 0.0
+
+    def server_timing(self, total_duration: float) -> str:
+        """
+        Return `Server-Timing` header value with the database and total time in milliseconds.
+        """
+        return (f'db;dur={self.duration * 1000:.1f};desc="{self.query_count} queries", '
+                f'total;dur={total_duration * 1000:.1f}')
+
+
+# Set for the duration of every request by `QueryStatsMiddleware`
+request_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_timer(conn: Connection, cursor: Any, statement: str, parameters: Any, context: Any,
+                           executemany: bool) -> None:
+    if request_query_stats.get() is not None:
+        conn.info.setdefault(QUERY_STATS_START_TIMES, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _count_statement(conn: Connection, cursor: Any, statement: str, parameters: Any, context: Any,
+                     executemany: bool) -> None:
+    stats = request_query_stats.get()
+    if stats is not None and conn.info.get(QUERY_STATS_START_TIMES):
+        stats.query_count += 1
+        stats.duration += time.perf_counter() - conn.info[QUERY_STATS_START_TIMES].pop()
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_statement_timer(exception_context: Any) -> None:
+    connection = exception_context.connection
+    if connection is not None and connection.info.get(QUERY_STATS_START_TIMES):
+        connection.info[QUERY_STATS_START_TIMES].pop()
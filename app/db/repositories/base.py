@@ -1,9 +1,11 @@
-import json
-from typing import Generic, List, Optional, Type, TypeVar
+from typing import Any, Dict, Generic, List, Optional, Type, TypeVar
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.db.base import Base
 
@@ -17,39 +19,49 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     Base repository with basic methods.
     """
 
-    def __init__(self, db: Session, model: Type[ModelType]) -> None:
+    def __init__(self, db: AsyncSession, model: Type[ModelType]) -> None:
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
 
-        :param db: A SQLAlchemy Session object.
+        :param db: A SQLAlchemy AsyncSession object.
         :param model: A SQLAlchemy model class.
         """
         self.db = db
         self.model = model
 
-    def get_all(self) -> List[ModelType]:
+    async def get_all(self) -> List[ModelType]:
         """
         Return all objects from specific db table.
         """
-        return self.db.query(self.model).all()
+        return list(await self.db.scalars(select(self.model)))
 
-    def get(self, obj_id: int) -> Optional[ModelType]:
+    async def get(self, obj_id: int) -> Optional[ModelType]:
         """
         Get object by `id` field.
         """
-        return self.db.query(self.model).filter(self.model.id == obj_id).first()
+        return await self.db.get(self.model, obj_id)
 
-    def create(self, obj_create: CreateSchemaType) -> ModelType:
+    async def merge_snapshot(self, snapshot: Dict[str, Any]) -> ModelType:
+        """
+        Attach object built from cached column values to the session without loading it from the database.
+        """
+        obj = self.model.__mapper__.class_manager.new_instance()
+        for key, value in snapshot.items():
+            set_committed_value(obj, key, value)
+        make_transient_to_detached(obj)
+        return await self.db.merge(obj, load=False)
+
+    async def create(self, obj_create: CreateSchemaType) -> ModelType:
         """
         Create new object in db table.
         """
         obj = self.model(**obj_create.dict())
         self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
+        await self.db.commit()
+        await self.db.refresh(obj)
         return obj
 
-    def update(self, obj: ModelType, obj_update: UpdateSchemaType) -> ModelType:
+    async def update(self, obj: ModelType, obj_update: UpdateSchemaType) -> ModelType:
         """
         Update model object by fields from `obj_update` schema.
         """
@@ -59,15 +71,15 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             if field in update_data:
                 setattr(obj, field, update_data[field])
         self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
+        await self.db.commit()
+        await self.db.refresh(obj)
         return obj
 
-    def delete(self, obj_id: int) -> Optional[ModelType]:
+    async def delete(self, obj_id: int) -> Optional[ModelType]:
         """
         Delete object.
         """
-        obj = self.db.query(self.model).get(obj_id)
-        self.db.delete(obj)
-        self.db.commit()
+        obj = await self.db.get(self.model, obj_id)
+        await self.db.delete(obj)
+        await self.db.commit()
         return obj
@@ -0,0 +1,61 @@
+from typing import Dict
+
+from fastapi import Depends
+from sqlalchemy import select, update, case, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.repositories.base import BaseRepository
+from app.db.session import get_db
+from app.models.coins import Coins
+from app.schemas.coins import CoinsInCreate, CoinsInUpdate
+
+
+class CoinsRepository(BaseRepository[Coins, CoinsInCreate, CoinsInUpdate]):
+    async def get_coin_supply(self) -> Dict[int, int]:
+        """
+        Get quantity of every coin value held by the machine.
+        """
+        result = await self.db.execute(select(Coins.value, Coins.quantity))
+        return {value: quantity for value, quantity in result}
+
+    async def add_coins(self, coins: Dict[int, int]) -> None:
+        """
+        Increment coin quantities with a single upsert, without committing.
+        Rows are upserted in coin value order, so concurrent deposits lock them in the same order.
+        :param coins: coin value to added quantity
+        """
+        if not coins:
+            return
+        connection = await self.db.connection()
+        dialect_insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+        statement = dialect_insert(Coins).values(
+            [{"value": value, "quantity": quantity} for value, quantity in sorted(coins.items())])
+        await self.db.execute(statement.on_conflict_do_update(
+            index_elements=[Coins.value],
+            set_={"quantity": Coins.quantity + statement.excluded.quantity, "updated_time": func.now()},
+        ))
+
+    async def take_coins(self, coins: Dict[int, int]) -> bool:
+        """
+        Decrement coin quantities in a single conditional `UPDATE`, without committing.
+        Returns False when the machine holds less of any coin than requested.
+        Coins are listed in value order, like the deposits upserting them.
+        :param coins: coin value to taken quantity
+        """
+        if not coins:
+            return True
+        coins = dict(sorted(coins.items()))
+        taken_quantity = case(coins, value=Coins.value)
+        result = await self.db.execute(
+            update(Coins)
+            .where(Coins.value.in_(list(coins)))
+            .where(Coins.quantity >= taken_quantity)
+            .values(quantity=Coins.quantity - taken_quantity)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == len(coins)
+
+
+def get_coins_repository(session: AsyncSession = Depends(get_db)) -> CoinsRepository:
+    return CoinsRepository(db=session, model=Coins)
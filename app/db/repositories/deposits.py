@@ -1,41 +1,55 @@
-from typing import List
+from typing import Dict, List, Optional
 
 from fastapi import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.repositories.base import BaseRepository, ModelType, UpdateSchemaType
+from app.db.repositories.base import BaseRepository
 from app.db.session import get_db
-from app.models.deposits import Deposits
+from app.models.deposits import Deposits, DEPOSIT_COIN_COLUMNS, NOT_UTILIZED_DEPOSIT
 from app.schemas.deposits import DepositInCreate, DepositInUpdate
 
 
 class DepositsRepository(BaseRepository[Deposits, DepositInCreate, DepositInUpdate]):
 
-    def get_not_utilized_deposits_by_user(self, user_id) -> Deposits:
-        deposit = self.db.query(Deposits).filter(Deposits.user_id == user_id).filter(
-            Deposits.is_deposit_utilized == False).first()
+    async def get_not_utilized_deposits_by_user(self, user_id) -> Deposits:
+        deposit = await self.db.scalar(select(Deposits).filter(Deposits.user_id == user_id).filter(
+            Deposits.is_deposit_utilized == False).limit(1))
         return deposit
 
-    def are_deposits_exists_for_user(self, user_id) -> bool:
-        deposit = self.db.query(Deposits).filter(Deposits.user_id == user_id).first()
+    async def are_deposits_exists_for_user(self, user_id) -> bool:
+        deposit = await self.db.scalar(select(Deposits).filter(Deposits.user_id == user_id).limit(1))
         return True if deposit else False
 
-    def create_deposit_with_total_amount(self, obj_create: DepositInCreate, user_id: int,
-                                         total_amount: float) -> ModelType:
-        obj = self.model(**obj_create.dict(), user_id=user_id, amount=total_amount)
-        self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
-        return obj
-
-    def update_deposit_as_utilized(self, deposit_id: int) -> Deposits:
-        obj = self.db.query(self.model).get(deposit_id)
-        setattr(obj, "is_deposit_utilized", True)
-        self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
-        return obj
-
-
-def get_deposits_repository(session: Session = Depends(get_db)) -> DepositsRepository:
+    async def create_not_utilized_deposit(self, coin_quantities: Dict[int, int], user_id: int,
+                                          total_amount_cents: int) -> Optional[Deposits]:
+        """
+        Insert the deposit with a single `INSERT ... ON CONFLICT DO NOTHING RETURNING`, without committing.
+        Returns None when the user already has a not utilized deposit.
+        """
+        connection = await self.db.connection()
+        dialect_insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+        values = {column: coin_quantities.get(coin, 0) for coin, column in DEPOSIT_COIN_COLUMNS.items()}
+        statement = dialect_insert(Deposits).values(amount_cents=total_amount_cents, user_id=user_id, **values) \
+            .on_conflict_do_nothing(index_elements=[Deposits.user_id],
+                                    index_where=NOT_UTILIZED_DEPOSIT) \
+            .returning(Deposits)
+        return await self.db.scalar(statement)
+
+    async def update_deposit_as_utilized(self, deposit_id: int) -> bool:
+        """
+        Mark the deposit as utilized without committing. Returns False when it was already utilized.
+        """
+        result = await self.db.execute(
+            update(Deposits)
+            .where(Deposits.id == deposit_id)
+            .where(Deposits.is_deposit_utilized == False)
+            .values(is_deposit_utilized=True)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+
+def get_deposits_repository(session: AsyncSession = Depends(get_db)) -> DepositsRepository:
     return DepositsRepository(db=session, model=Deposits)
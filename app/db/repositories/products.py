@@ -1,95 +1,310 @@
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
 
-from fastapi import Depends
-from sqlalchemy import select, func, desc, asc
-from sqlalchemy.orm import Session
+from fastapi import Depends, status
+from sqlalchemy import select, func, update, case, tuple_, literal, insert, true, Table, MetaData, Column, String, \
+    BigInteger, Integer
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.pagination import SortEnum
+from app.core.cache import LRUCache
+from app.core.config import get_app_settings
+from app.core.exceptions import ProductAlreadyExistsException
+from app.core.pagination import SortEnum, Cursor, CursorDirectionEnum
 from app.db.repositories.base import BaseRepository, ModelType
-from app.db.session import get_db
+from app.db.session import get_db, invalidate_after_commit
+from app.db.utils import model_to_dict, is_unique_violation
+from app.models.counters import Counters, ACTIVE_PRODUCTS_COUNTER
 from app.models.products import Products
 from app.schemas.products import ProductInCreate, ProductInUpdate
-from app.schemas.purchases import PurchaseInCreate
+
+
+# Staging table receiving `COPY` of imported products on PostgreSQL, dropped at the end of the transaction
+products_import_table = Table(
+    "products_import", MetaData(),
+    Column("name", String, nullable=False),
+    Column("price_cents", BigInteger, nullable=False),
+    Column("quantity", Integer, nullable=False),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+settings = get_app_settings()
+product_cache = LRUCache(name="products", maxsize=settings.product_cache_size,
+                         ttl=settings.product_cache_ttl_seconds)
+
+
+def get_product_values(obj_create: ProductInCreate, user_id: int) -> Dict[str, Any]:
+    """
+    Return column values of a new product, the dollar price is stored as integer cents.
+    """
+    return {**obj_create.dict(exclude={"price"}), "price_cents": obj_create.price_cents, "creator_id": user_id}
 
 
 class ProductsRepository(BaseRepository[Products, ProductInCreate, ProductInUpdate]):
-    def create_with_user(self, obj_create: ProductInCreate, user_id: int) -> ModelType:
+    async def get(self, obj_id: int) -> Optional[Products]:
+        """
+        Get product by `id` through the product cache.
+        Cache hits are merged into the session without loading the row from the database.
+        """
+        snapshot = product_cache.get(obj_id)
+        if snapshot is not None:
+            return await self.merge_snapshot(snapshot)
+        generation = product_cache.generation
+        product = await super().get(obj_id)
+        if product is not None:
+            product_cache.set(obj_id, model_to_dict(product), generation=generation)
+        return product
+
+    async def create_many_with_user(self, objs_create: List[ProductInCreate], user_id: int) -> List[Products]:
+        """
+        Create products with a single multi-row `INSERT ... RETURNING` in one transaction.
+        :return: created products in the order of `objs_create`
+        """
+        try:
+            products = list(await self.db.scalars(
+                insert(Products).returning(Products, sort_by_parameter_order=True),
+                [get_product_values(obj_create, user_id) for obj_create in objs_create],
+            ))
+            await self.change_active_products_count(len(products))
+            await self.db.commit()
+        except IntegrityError as exc:
+            await self.db.rollback()
+            if not is_unique_violation(exc, Products.name):
+                raise
+            raise ProductAlreadyExistsException(message="Some of the products were created concurrently, "
+                                                        "please try again",
+                                                status_code=status.HTTP_400_BAD_REQUEST) from exc
+        return products
+
+    async def import_with_user(self, chunks: AsyncIterator[List[ProductInCreate]], user_id: int) -> int:
+        """
+        Load chunks of products, skipping names which are already used. Every chunk is committed in its own
+        transaction, so no pooled connection or lock is held while the next chunk is still uploading.
+        A failed import keeps the chunks committed before the failure and can be repeated,
+        the already created names are skipped.
+        PostgreSQL loads a chunk with `COPY` into a staging table, SQLite with `executemany`.
+        :return: number of created products
+        """
+        created_count = 0
+        async for chunk in chunks:
+            try:
+                connection = await self.db.connection()
+                if connection.dialect.name == "postgresql":
+                    chunk_created_count = await self._copy_products_with_user(chunk, user_id)
+                else:
+                    chunk_created_count = await self._insert_products_with_user(chunk, user_id)
+                await self.change_active_products_count(chunk_created_count)
+                await self.db.commit()
+            except Exception:
+                await self.db.rollback()
+                raise
+            created_count += chunk_created_count
+        return created_count
+
+    async def _copy_products_with_user(self, chunk: List[ProductInCreate], user_id: int) -> int:
+        connection = await self.db.connection()
+        await connection.run_sync(products_import_table.create)
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            products_import_table.name, columns=["name", "price_cents", "quantity"],
+            records=[(product.name, product.price_cents, product.quantity) for product in chunk],
+        )
+        columns = products_import_table.c
+        result = await self.db.execute(
+            postgresql.insert(Products.__table__).from_select(
+                ["name", "price_cents", "quantity", "creator_id", "is_active", "created_time", "updated_time"],
+                select(columns.name, columns.price_cents, columns.quantity, literal(user_id), true(), func.now(),
+                       func.now()),
+            ).on_conflict_do_nothing(index_elements=["name"])
+        )
+        return result.rowcount
+
+    async def _insert_products_with_user(self, chunk: List[ProductInCreate], user_id: int) -> int:
+        statement = sqlite.insert(Products.__table__).on_conflict_do_nothing(index_elements=["name"])
+        result = await self.db.execute(statement, [get_product_values(product, user_id) for product in chunk])
+        return result.rowcount
+
+    def invalidate_cached_products(self, product_ids: List[int]) -> None:
+        invalidate_after_commit(self.db, product_cache, product_ids)
+
+    @staticmethod
+    def product_already_exists(product_name: str) -> ProductAlreadyExistsException:
+        return ProductAlreadyExistsException(message=f"Product with name: `{product_name}` already exists",
+                                             status_code=status.HTTP_400_BAD_REQUEST)
+
+    async def update(self, obj: Products, obj_update: ProductInUpdate) -> Products:
+        """
+        Update product, raises `ProductAlreadyExistsException` when the new name is taken.
+        """
+        self.invalidate_cached_products([obj.id])
+        if obj_update.price is not None:
+            obj.price_cents = obj_update.price_cents
+        try:
+            return await super().update(obj, obj_update)
+        except IntegrityError as exc:
+            await self.db.rollback()
+            if not is_unique_violation(exc, Products.name):
+                raise
+            raise self.product_already_exists(obj_update.name) from exc
+
+    async def create_with_user(self, obj_create: ProductInCreate, user_id: int) -> ModelType:
         """
-        Create new object in db table.
+        Create new object in db table, raises `ProductAlreadyExistsException` when the name is taken.
         """
-        obj = self.model(**obj_create.dict(), creator_id=user_id)
+        obj = self.model(**get_product_values(obj_create, user_id))
         self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
+        await self.change_active_products_count(1)
+        try:
+            await self.db.commit()
+        except IntegrityError as exc:
+            await self.db.rollback()
+            if not is_unique_violation(exc, Products.name):
+                raise
+            raise self.product_already_exists(obj_create.name) from exc
+        await self.db.refresh(obj)
         return obj
 
-    def get_all_active_paginated_products(self, limit: int, offset: int, order: SortEnum) -> dict:
+    @staticmethod
+    def _order_by_created_time(ascending: bool) -> tuple:
+        if ascending:
+            return Products.created_time.asc(), Products.id.asc()
+        return Products.created_time.desc(), Products.id.desc()
+
+    async def count_active_products(self, exact: bool = False) -> int:
+        """
+        Count all active products. Served from the `active_products` counter unless `exact` is set
+        or the counter row is missing, the counter row is created with the table.
+        :return:
+        """
+        if not exact:
+            count = await self.db.scalar(select(Counters.value).filter(Counters.name == ACTIVE_PRODUCTS_COUNTER))
+            if count is not None:
+                return count
+        return await self.db.scalar(select(func.count()).select_from(Products).filter(Products.is_active == True))
+
+    async def change_active_products_count(self, delta: int) -> None:
+        """
+        Change the `active_products` counter by `delta` in the current transaction, without committing.
+        :param delta:
+        :return:
+        """
+        await self.db.execute(
+            update(Counters)
+            .where(Counters.name == ACTIVE_PRODUCTS_COUNTER)
+            .values(value=Counters.value + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get_all_active_paginated_products(self, limit: int, offset: int, order: SortEnum) -> List[Products]:
         """
-        Get all active products
+        Get active products page using `LIMIT/OFFSET`
         :return:
         """
-        order = desc if order == SortEnum.DESCENDING else asc
-        with self.db as session:
-            query = select(Products).filter(Products.is_active == True)
-            return {
-                'count': session.scalar(select(func.count()).select_from(query.subquery())),
-                'products': [product for product in
-                             session.scalars(query.limit(limit).offset(offset).order_by(order(Products.created_time)))]
-            }
+        query = select(Products).filter(Products.is_active == True).order_by(
+            *self._order_by_created_time(order == SortEnum.ASCENDING))
+        return list(await self.db.scalars(query.limit(limit).offset(offset)))
 
-    def get_product_by_name(self, product_name: str) -> Products:
+    async def get_all_active_products_by_cursor(self, limit: int, order: SortEnum,
+                                                cursor: Optional[Cursor]) -> List[Products]:
+        """
+        Get active products following (or preceding) the cursor position ordered by `(created_time, id)`.
+        Uses keyset pagination, so every page costs the same regardless of its depth.
+        :return: products in the requested `order`
+        """
+        backwards = cursor is not None and cursor.direction == CursorDirectionEnum.PREVIOUS
+        ascending = (order == SortEnum.ASCENDING) != backwards
+        query = select(Products).filter(Products.is_active == True)
+        if cursor:
+            sort_key = tuple_(Products.created_time, Products.id)
+            position = tuple_(literal(cursor.created_time, Products.created_time.type), cursor.id)
+            query = query.filter(sort_key > position if ascending else sort_key < position)
+        products = list(await self.db.scalars(query.order_by(*self._order_by_created_time(ascending)).limit(limit)))
+        if backwards:
+            products.reverse()
+        return products
+
+    async def get_product_by_name(self, product_name: str) -> Products:
         """
         Get product based on name
         :param product_name:
         :return:
         """
-        product = self.db.query(Products).filter(Products.name == product_name).first()
+        product = await self.db.scalar(select(Products).filter(Products.name == product_name).limit(1))
         return product
 
-    def get_active_products_by_product_ids(self, product_ids: List[int]) -> List[Products]:
+    async def get_existing_product_names(self, product_names: Set[str]) -> Set[str]:
+        """
+        Get which of the given product names are already used
+        :param product_names:
+        :return:
+        """
+        return set(await self.db.scalars(select(Products.name).filter(Products.name.in_(product_names))))
+
+    async def get_active_products_by_product_ids(self, product_ids: List[int], lock: bool = False) -> List[Products]:
         """
         Get products
         :param product_ids:
+        :param lock: lock the selected rows (`SELECT ... FOR UPDATE`) until the transaction ends
         :return:
         """
-        products: List[Products] = self.db.query(Products).filter(Products.id.in_(product_ids)).filter(
-            Products.is_active == True).all()
+        query = select(Products).filter(Products.id.in_(product_ids)).filter(Products.is_active == True)
+        if lock:
+            query = query.order_by(Products.id).with_for_update().execution_options(populate_existing=True)
+        products: List[Products] = list(await self.db.scalars(query))
         return products
 
-    def are_active_products_exists_for_user(self, user_id: int) -> bool:
+    async def are_active_products_exists_for_user(self, user_id: int) -> bool:
         """
         Get products
         :param user_id:
         :return:
         """
-        product = self.db.query(Products).filter(Products.creator_id == user_id).filter(
-            Products.is_active == True).first()
+        product = await self.db.scalar(select(Products).filter(Products.creator_id == user_id).filter(
+            Products.is_active == True).limit(1))
         return True if product else False
 
-    def update_product_as_inactive(self, product_id: int) -> Products:
-        product_obj = self.db.query(Products).filter(Products.id == product_id).first()
+    async def update_product_as_inactive(self, product_id: int) -> Products:
+        product_obj = await self.db.get(Products, product_id)
         product_obj.is_active = False
         self.db.add(product_obj)
-        self.db.commit()
-        self.db.refresh(product_obj)
+        self.invalidate_cached_products([product_id])
+        await self.change_active_products_count(-1)
+        await self.db.commit()
+        await self.db.refresh(product_obj)
         return product_obj
 
-    def update_product_quantities(self, purchase: PurchaseInCreate, products_list: List[Products]) -> List[Products]:
-        product_id_quantity_map = {}
-        for product in purchase.products:
-            product_id_quantity_map[product.product_id] = product.quantity
+    async def delete(self, obj_id: int) -> Optional[Products]:
+        """
+        Delete product and keep the `active_products` counter in sync.
+        """
+        obj = await self.db.get(self.model, obj_id)
+        await self.db.delete(obj)
+        self.invalidate_cached_products([obj_id])
+        if obj.is_active:
+            await self.change_active_products_count(-1)
+        await self.db.commit()
+        return obj
 
-        for product_obj in products_list:
-            purchase_quantity = product_id_quantity_map[product_obj.id]
-            existing_quantity = product_obj.quantity
-            new_quantity = existing_quantity - purchase_quantity if existing_quantity - purchase_quantity > 0 else 0
-            setattr(product_obj, "quantity", new_quantity)
-        self.db.add_all(products_list)
-        self.db.commit()
-        for product_obj in products_list:
-            self.db.refresh(product_obj)
-        return products_list
+    async def update_product_quantities(self, product_id_quantity_map: Dict[int, int]) -> bool:
+        """
+        Decrement quantities of all products in a single conditional `UPDATE`, without committing.
+        Returns False when any product is inactive or has less quantity than requested.
+        :param product_id_quantity_map: product id to purchased quantity
+        :return:
+        """
+        self.invalidate_cached_products(list(product_id_quantity_map))
+        purchased_quantity = case(product_id_quantity_map, value=Products.id)
+        result = await self.db.execute(
+            update(Products)
+            .where(Products.id.in_(product_id_quantity_map.keys()))
+            .where(Products.is_active == True)
+            .where(Products.quantity >= purchased_quantity)
+            .values(quantity=Products.quantity - purchased_quantity)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == len(product_id_quantity_map)
 
 
-def get_products_repository(session: Session = Depends(get_db)) -> ProductsRepository:
+def get_products_repository(session: AsyncSession = Depends(get_db)) -> ProductsRepository:
     return ProductsRepository(db=session, model=Products)
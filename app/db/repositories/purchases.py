@@ -1,36 +1,61 @@
-from typing import List
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
 
 from fastapi import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, Row
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.repositories.base import BaseRepository
 from app.db.session import get_db
+from app.models.deposits import Deposits
+from app.models.products import Products
 from app.models.purchases import Purchases
 from app.schemas.purchases import PurchaseInCreate, PurchaseInUpdate
 
 
 class PurchasesRepository(BaseRepository[Purchases, PurchaseInCreate, PurchaseInUpdate]):
-    def create_product_purchases(self, purchase: PurchaseInCreate, product_id_price_map: dict,
-                                 deposit_id: int) -> List[Purchases]:
+    async def create_product_purchases(self, purchase: PurchaseInCreate, product_id_price_map: dict,
+                                       deposit_id: int) -> None:
+        """
+        Insert all purchase rows with a single multi-row `INSERT`, without committing.
+        """
         purchase_dict = purchase.dict()
         objs_create = purchase_dict.get("products")
         for obj in objs_create:
             product_quantity = obj.get("quantity")
             product_id = obj.get("product_id")
             product_price = product_id_price_map.get(product_id)
-            obj["total_spent"] = round(product_quantity * product_price, 2)
+            obj["total_spent_cents"] = product_quantity * product_price
             obj["deposit_id"] = deposit_id
-        purchases_objs = [Purchases(**data) for data in objs_create]
-        self.db.add_all(purchases_objs)
-        self.db.commit()
-        for purchase_obj in purchases_objs:
-            self.db.refresh(purchase_obj)
-        return purchases_objs
-
-    def are_purchases_exists_for_product(self, product_id: int) -> bool:
-        purchases = self.db.query(Purchases).filter(Purchases.product_id == product_id).first()
+        await self.db.execute(insert(Purchases), objs_create)
+
+    async def are_purchases_exists_for_product(self, product_id: int) -> bool:
+        purchases = await self.db.scalar(select(Purchases).filter(Purchases.product_id == product_id).limit(1))
         return True if purchases else False
 
+    async def stream_purchases_for_user(self, user_id: int, as_seller: bool, start_time: Optional[datetime],
+                                        end_time: Optional[datetime], batch_size: int) -> AsyncIterator[Sequence[Row]]:
+        """
+        Stream purchases made by the buyer (or of products created by the seller) in batches of rows
+        with a server-side cursor. Runs in its own session, so it can outlive the request session.
+        """
+        query = select(Purchases.id, Purchases.created_time, Purchases.product_id, Products.name.label("product_name"),
+                       Purchases.quantity, Purchases.total_spent_cents, Purchases.deposit_id) \
+            .join(Products, Products.id == Purchases.product_id)
+        if as_seller:
+            query = query.filter(Products.creator_id == user_id)
+        else:
+            query = query.join(Deposits, Deposits.id == Purchases.deposit_id).filter(Deposits.user_id == user_id)
+        if start_time:
+            query = query.filter(Purchases.created_time >= start_time)
+        if end_time:
+            query = query.filter(Purchases.created_time < end_time)
+        query = query.order_by(Purchases.id).execution_options(yield_per=batch_size)
+        async with AsyncSession(bind=self.db.bind) as session:
+            result = await session.stream(query)
+            async for rows in result.partitions():
+                yield rows
+
 
-def get_purchases_repository(session: Session = Depends(get_db)) -> PurchasesRepository:
+def get_purchases_repository(session: AsyncSession = Depends(get_db)) -> PurchasesRepository:
     return PurchasesRepository(db=session, model=Purchases)
@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import Depends
+from sqlalchemy import select, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.repositories.base import BaseRepository
+from app.db.session import get_db
+from app.models.sales import Sales
+from app.schemas.sales import SalesInCreate, SalesInUpdate
+
+
+class SalesRepository(BaseRepository[Sales, SalesInCreate, SalesInUpdate]):
+    async def add_product_sales(self, product_id_quantity_map: Dict[int, int], product_id_price_map: Dict[int, int],
+                                bucket_time: datetime) -> None:
+        """
+        Add sold units and revenue to the hourly rollup rows of the products with one upsert, without committing.
+        """
+        connection = await self.db.connection()
+        dialect_insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+        statement = dialect_insert(Sales).values([
+            {"product_id": product_id, "bucket_time": bucket_time, "units": quantity,
+             "revenue_cents": product_id_price_map[product_id] * quantity}
+            for product_id, quantity in product_id_quantity_map.items()
+        ])
+        await self.db.execute(statement.on_conflict_do_update(
+            index_elements=[Sales.product_id, Sales.bucket_time],
+            set_={"units": Sales.units + statement.excluded.units,
+                  "revenue_cents": Sales.revenue_cents + statement.excluded.revenue_cents,
+                  "updated_time": func.now()},
+        ))
+
+    async def get_product_sales(self, product_id: int, start_time: Optional[datetime],
+                                end_time: Optional[datetime]) -> List[Sales]:
+        """
+        Get hourly rollup rows of the product ordered by hour.
+        """
+        query = select(Sales).filter(Sales.product_id == product_id)
+        if start_time:
+            query = query.filter(Sales.bucket_time >= start_time)
+        if end_time:
+            query = query.filter(Sales.bucket_time < end_time)
+        return list(await self.db.scalars(query.order_by(Sales.bucket_time)))
+
+
+def get_sales_repository(session: AsyncSession = Depends(get_db)) -> SalesRepository:
+    return SalesRepository(db=session, model=Sales)
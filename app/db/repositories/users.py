@@ -1,15 +1,24 @@
-import json
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import Depends
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from fastapi import Depends, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash
+from app.core.cache import LRUCache
+from app.core.config import get_app_settings
+from app.core.exceptions import UserAlreadyExistException
+from app.core.security import hash_password
+from app.core.user_roles_enum import UserRoles
 from app.db.repositories.base import BaseRepository, ModelType, UpdateSchemaType
 from app.models.users import Users
 from app.schemas.users import UserInCreate, UserInUpdate
-from app.db.session import get_db
+from app.db.session import get_db, invalidate_after_commit
+from app.db.utils import model_to_dict, is_unique_violation
+
+settings = get_app_settings()
+# Authenticated users by username, password hashes are never cached
+user_cache = LRUCache(name="users", maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl_seconds)
 
 
 class UsersRepository(BaseRepository[Users, UserInCreate, UserInUpdate]):
@@ -17,32 +26,92 @@ class UsersRepository(BaseRepository[Users, UserInCreate, UserInUpdate]):
     Repository to manipulate with the task.
     """
 
-    def get_by_username(self, username: str) -> Optional[Users]:
+    async def get_by_username(self, username: str) -> Optional[Users]:
         """
         Get user by `username` field.
         """
-        return self.db.query(Users).filter(Users.username == username).first()
+        return await self.db.scalar(select(Users).filter(Users.username == username).limit(1))
+
+    async def commit_unique_username(self, username: str) -> None:
+        """
+        Commit the session, turning the unique `username` violation into `UserAlreadyExistException`.
+        """
+        try:
+            await self.db.commit()
+        except IntegrityError as exc:
+            await self.db.rollback()
+            if not is_unique_violation(exc, Users.username):
+                raise
+            raise UserAlreadyExistException(message=f"User with username: `{username}` already exists",
+                                            status_code=status.HTTP_400_BAD_REQUEST) from exc
+
+    async def create(self, obj_create: UserInCreate) -> Users:
+        """
+        Create new user, the password is hashed off the event loop.
+        Raises `UserAlreadyExistException` when the username is taken.
+        """
+        hashed_password = await hash_password(password=obj_create.password)
+        obj = self.model(**obj_create.dict(exclude={"password"}), hashed_password=hashed_password)
+        self.db.add(obj)
+        await self.commit_unique_username(obj.username)
+        await self.db.refresh(obj)
+        return obj
+
+    async def get_authenticated_by_username(self, username: str) -> Optional[Users]:
+        """
+        Get user by `username` through the user cache, used to resolve the user of an access token.
+        The returned user has no `hashed_password` loaded when it comes from the cache.
+        """
+        snapshot = user_cache.get(username)
+        if snapshot is not None:
+            return await self.merge_snapshot(snapshot)
+        generation = user_cache.generation
+        user = await self.get_by_username(username)
+        if user is not None:
+            snapshot = model_to_dict(user)
+            snapshot.pop("hashed_password")
+            user_cache.set(username, snapshot, generation=generation)
+        return user
 
-    def update(self, obj: ModelType, obj_update: UpdateSchemaType) -> ModelType:
-        obj_data = jsonable_encoder(obj)
+    def invalidate_cached_users(self, usernames: List[str]) -> None:
+        invalidate_after_commit(self.db, user_cache, usernames)
+
+    async def update(self, obj: ModelType, obj_update: UpdateSchemaType) -> ModelType:
+        self.invalidate_cached_users([obj.username])
+        # Users resolved through the cache have no `hashed_password` loaded, so use mapped columns
+        obj_data = self.model.__mapper__.column_attrs.keys()
         update_data = obj_update.dict(exclude_unset=True)
         if update_data.get("roles"):
-            update_data["roles"] = json.dumps(update_data["roles"])
+            update_data["roles"] = int(UserRoles.from_role_names(update_data["roles"]))
         if update_data.get("password"):
-            update_data["hashed_password"] = get_password_hash(password=update_data["password"])
+            update_data["hashed_password"] = await hash_password(password=update_data["password"])
         for field in obj_data:
             if field in update_data:
                 setattr(obj, field, update_data[field])
         self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
+        await self.commit_unique_username(obj.username)
+        await self.db.refresh(obj)
         return obj
 
-    def disable_user(self, obj: Users) -> Users:
+    async def update_password_hash(self, obj: Users, hashed_password: str) -> Users:
+        obj.hashed_password = hashed_password
+        self.db.add(obj)
+        await self.db.commit()
+        return obj
+
+    async def disable_user(self, obj: Users) -> Users:
+        self.invalidate_cached_users([obj.username])
         obj.disabled = True
         self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
+        await self.db.commit()
+        await self.db.refresh(obj)
+        return obj
+
+    async def delete(self, obj_id: int) -> Optional[Users]:
+        obj = await self.db.get(self.model, obj_id)
+        self.invalidate_cached_users([obj.username])
+        await self.db.delete(obj)
+        await self.db.commit()
         return obj
 
     @staticmethod
@@ -53,5 +122,5 @@ class UsersRepository(BaseRepository[Users, UserInCreate, UserInUpdate]):
         return not user.disabled
 
 
-def get_users_repository(session: Session = Depends(get_db)) -> UsersRepository:
+def get_users_repository(session: AsyncSession = Depends(get_db)) -> UsersRepository:
     return UsersRepository(db=session, model=Users)
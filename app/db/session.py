@@ -1,22 +1,96 @@
-from typing import Generator
+import asyncio
+from typing import Any, AsyncGenerator, Dict, Hashable, Iterable
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
 
+from app.core.cache import LRUCache
 from app.core.config import get_app_settings
+from app.db.pool import InstrumentedQueuePool, get_pool_stats
+from app.db.query_log import instrument_engine
 
 settings = get_app_settings()
 
-engine = create_engine(url=settings.database_url, echo=True, future=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+PENDING_CACHE_INVALIDATIONS = "pending_cache_invalidations"
 
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-def get_db() -> Generator:
+
+def get_async_database_url(database_url: str) -> str:
+    """
+    Return database url with an async driver, e.g. `postgresql://` becomes `postgresql+asyncpg://`.
+    """
+    scheme, separator, rest = database_url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+def get_engine_kwargs(database_url: str) -> Dict[str, Any]:
+    """
+    Return pool configuration for the engine. In-memory SQLite keeps its default single connection pool.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {"poolclass": InstrumentedQueuePool, **settings.database_pool_kwargs}
+
+
+database_url = get_async_database_url(settings.database_url)
+engine = create_async_engine(url=database_url, echo=settings.database_echo, **get_engine_kwargs(database_url))
+instrument_engine(engine.sync_engine, settings.slow_query_threshold_ms, settings.query_log_sample_rate)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     Generator dependency yield database connection.
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def warm_up_pool() -> None:
+    """
+    Open `min_connection_count` connections at once so first requests don't pay connection setup.
+    """
+    connections = await asyncio.gather(*(engine.connect().start() for _ in range(settings.min_connection_count)))
+    await asyncio.gather(*(connection.close() for connection in connections))
+
+
+async def dispose_pool() -> None:
+    """
+    Close all pooled connections.
+    """
+    await engine.dispose()
+
+
+def get_pool_status() -> Dict[str, Any]:
+    """
+    Return live statistics of the application connection pool.
+    """
+    return get_pool_stats(engine.pool)
+
+
+def invalidate_after_commit(db: AsyncSession, cache: LRUCache, keys: Iterable[Hashable]) -> None:
+    """
+    Invalidate cache keys now and once more when the session commits,
+    so values read by concurrent requests before the commit don't stay cached.
+    """
+    keys = list(keys)
+    cache.invalidate(keys)
+    db.info.setdefault(PENDING_CACHE_INVALIDATIONS, []).append((cache, keys))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_cache_keys(session: Session) -> None:
+    for cache, keys in session.info.pop(PENDING_CACHE_INVALIDATIONS, []):
+        cache.invalidate(keys)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_cache_invalidations(session: Session, previous_transaction: Any) -> None:
+    session.info.pop(PENDING_CACHE_INVALIDATIONS, None)
@@ -1,4 +1,5 @@
-from sqlalchemy.orm import class_mapper
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import InstrumentedAttribute, class_mapper
 
 
 def model_to_dict(obj):
@@ -20,3 +21,18 @@ def model_to_dict(obj):
         result[column.key] = value
 
     return result
+
+
+def is_unique_violation(exc: IntegrityError, attribute: InstrumentedAttribute) -> bool:
+    """
+    Check if the integrity error violates the unique constraint of the model attribute column.
+    PostgreSQL reports the constraint name, `<table>_<column>_key` when created by the migrations
+    or `ix_<table>_<column>` when created by `create_all`, SQLite only reports the column.
+    """
+    column = attribute.expression
+    table_name, column_name = column.table.name, column.name
+    diag = getattr(exc.orig, "diag", None)
+    constraint_name = getattr(exc.orig.__cause__, "constraint_name", None) or getattr(diag, "constraint_name", None)
+    if constraint_name is not None:
+        return constraint_name in (f"{table_name}_{column_name}_key", f"ix_{table_name}_{column_name}")
+    return f"UNIQUE constraint failed: {table_name}.{column_name}" in str(exc.orig)
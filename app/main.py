@@ -3,7 +3,10 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_app_settings
 from app.core.exceptions import add_exceptions_handlers
+from app.core.middleware import MetricsMiddleware, QueryStatsMiddleware
+from app.db.session import warm_up_pool, dispose_pool
 from app.routers.base_router import router as api_router
+from app.routers.metrics import router as metrics_router
 
 
 def create_app() -> FastAPI:
@@ -22,10 +25,17 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    application.add_middleware(QueryStatsMiddleware, query_budget=settings.request_query_budget)
+    application.add_middleware(MetricsMiddleware)
+
     application.include_router(api_router, prefix="/api/v1")
+    application.include_router(metrics_router)
 
     add_exceptions_handlers(app=application)
 
+    application.add_event_handler("startup", warm_up_pool)
+    application.add_event_handler("shutdown", dispose_pool)
+
     return application
 
 
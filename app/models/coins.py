@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime, func
+
+from app.db.base import Base
+
+
+class Coins(Base):
+    """
+    Quantity of every coin denomination held by the machine.
+    """
+    value = Column(Integer, primary_key=True)
+    quantity = Column(BigInteger, nullable=False, default=0)
+
+    updated_time = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -0,0 +1,25 @@
+from typing import Any
+
+from sqlalchemy import Column, String, BigInteger, DateTime, func, event, Table
+from sqlalchemy.engine import Connection
+
+from app.db.base import Base
+
+ACTIVE_PRODUCTS_COUNTER = "active_products"
+
+
+class Counters(Base):
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+    updated_time = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    def __init__(self, name: str, value: int = 0) -> None:
+        self.name = name
+        self.value = value
+
+
+@event.listens_for(Counters.__table__, "after_create")
+def _create_counter_rows(table: Table, connection: Connection, **kwargs: Any) -> None:
+    # Tables created with `create_all` start empty, migrations seed the counters from existing rows
+    connection.execute(table.insert().values(name=ACTIVE_PRODUCTS_COUNTER, value=0))
@@ -1,16 +1,31 @@
-import json
+from typing import Dict, List
 
-from sqlalchemy import Column, Integer, Numeric, ForeignKey, DateTime, func, String, Boolean
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey, DateTime, func, Boolean, Index, text
 from sqlalchemy.orm import relationship
 
+from app.core.constants import ALLOWED_CENT_COINS
 from app.db.base import Base
 
+# Deposited quantity of every coin is kept in its own column, e.g. `coins_5`
+DEPOSIT_COIN_COLUMNS = {coin: f"coins_{coin}" for coin in ALLOWED_CENT_COINS}
+NOT_UTILIZED_DEPOSIT = text("NOT is_deposit_utilized")
+
 
 class Deposits(Base):
+    __table_args__ = (
+        # One not utilized deposit per user, also backs the lookup of the current deposit of a user
+        Index("uq_deposits_user_id_not_utilized", "user_id", unique=True,
+              postgresql_where=NOT_UTILIZED_DEPOSIT, sqlite_where=NOT_UTILIZED_DEPOSIT),
+    )
+
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    amount = Column(Numeric(11, 2), nullable=False)
-    coins = Column(String, nullable=False)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    amount_cents = Column(BigInteger, nullable=False)
+    coins_5 = Column(Integer, nullable=False, default=0)
+    coins_10 = Column(Integer, nullable=False, default=0)
+    coins_20 = Column(Integer, nullable=False, default=0)
+    coins_50 = Column(Integer, nullable=False, default=0)
+    coins_100 = Column(Integer, nullable=False, default=0)
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
     is_deposit_utilized = Column(Boolean, default=False)
 
     # Relationships
@@ -20,7 +35,25 @@ class Deposits(Base):
     created_time = Column(DateTime, default=func.now())
     updated_time = Column(DateTime, default=func.now(), onupdate=func.now())
 
-    def __init__(self, amount: float, coins: list, user_id: int):
-        self.amount = amount
-        self.coins = json.dumps(coins)
+    def __init__(self, amount_cents: int, coin_quantities: Dict[int, int], user_id: int):
+        self.amount_cents = amount_cents
+        for coin, column in DEPOSIT_COIN_COLUMNS.items():
+            setattr(self, column, coin_quantities.get(coin, 0))
         self.user_id = user_id
+
+    @property
+    def coin_quantities(self) -> Dict[int, int]:
+        """
+        Coin value to deposited quantity of the deposited coins.
+        """
+        quantities = ((coin, getattr(self, column)) for coin, column in DEPOSIT_COIN_COLUMNS.items())
+        return {coin: quantity for coin, quantity in quantities if quantity}
+
+    @property
+    def coins(self) -> List[dict]:
+        return [{"value": coin, "quantity": quantity} for coin, quantity in self.coin_quantities.items()]
+
+
+# Every allowed coin needs its deposit column and every deposit column an allowed coin
+assert {column for column in Deposits.__table__.columns.keys() if column.startswith("coins_")} == set(
+    DEPOSIT_COIN_COLUMNS.values()), "Deposit coin columns don't match ALLOWED_CENT_COINS"
@@ -1,13 +1,22 @@
-from sqlalchemy import Column, BigInteger, String, Numeric, Integer, ForeignKey, DateTime, func, Boolean
+from sqlalchemy import Column, BigInteger, String, Integer, ForeignKey, DateTime, func, Boolean, Index, text
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
 
 
 class Products(Base):
+    __table_args__ = (
+        # Backs keyset pagination of the catalog ordered by `(created_time, id)`
+        Index("ix_products_active_created_time_id", "is_active", "created_time", "id"),
+        # Backs the check of active products of a seller
+        Index("ix_products_creator_id_active", "creator_id", postgresql_where=text("is_active"),
+              sqlite_where=text("is_active")),
+    )
+
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String, unique=True, index=True, nullable=False)
-    price = Column(Numeric(11, 2), nullable=False)
+    price_cents = Column(BigInteger, nullable=False)
     quantity = Column(Integer, nullable=False)
     is_active = Column(Boolean, nullable=False, default=True)
 
@@ -15,13 +24,16 @@ class Products(Base):
     creator_id = Column(Integer, ForeignKey('users.id'))
     creator = relationship("Users", back_populates="products")
 
-    created_time = Column(DateTime, default=func.now())
+    # SQLite stores `CURRENT_TIMESTAMP` without microseconds, keep cursor values comparable with it
+    created_time = Column(DateTime().with_variant(sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d",
+        regexp=r"(\d+)-(\d+)-(\d+) (\d+):(\d+):(\d+)"), "sqlite"), default=func.now())
     updated_time = Column(DateTime, default=func.now(), onupdate=func.now())
 
     def __init__(
-            self, name: str, price: float, quantity: int, creator_id: int
+            self, name: str, price_cents: int, quantity: int, creator_id: int
     ) -> None:
         self.name = name
-        self.price = price
+        self.price_cents = price_cents
         self.quantity = quantity
         self.creator_id = creator_id
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Numeric, DateTime, func
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey, DateTime, func
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -6,10 +6,10 @@ from app.db.base import Base
 
 class Purchases(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    product_id = Column(Integer, ForeignKey('products.id'))
-    deposit_id = Column(Integer, ForeignKey('deposits.id'))
+    product_id = Column(Integer, ForeignKey('products.id'), index=True)
+    deposit_id = Column(Integer, ForeignKey('deposits.id'), index=True)
     quantity = Column(Integer, nullable=False)
-    total_spent = Column(Numeric(11, 2), nullable=False)
+    total_spent_cents = Column(BigInteger, nullable=False)
 
     # Relationships
     deposit = relationship("Deposits", back_populates="purchases")
@@ -18,8 +18,8 @@ class Purchases(Base):
     created_time = Column(DateTime, default=func.now())
     updated_time = Column(DateTime, default=func.now(), onupdate=func.now())
 
-    def __init__(self, product_id: int, quantity: int, total_spent: float, deposit_id: int):
+    def __init__(self, product_id: int, quantity: int, total_spent_cents: int, deposit_id: int):
         self.product_id = product_id
         self.quantity = quantity
-        self.total_spent = total_spent
+        self.total_spent_cents = total_spent_cents
         self.deposit_id = deposit_id
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, BigInteger, func
+
+from app.db.base import Base
+
+
+class Sales(Base):
+    """
+    Units sold and revenue per product and UTC hour, kept current by the purchase transaction.
+    """
+    product_id = Column(Integer, ForeignKey('products.id'), primary_key=True)
+    bucket_time = Column(DateTime, primary_key=True)
+    units = Column(BigInteger, nullable=False, default=0)
+    revenue_cents = Column(BigInteger, nullable=False, default=0)
+
+    updated_time = Column(DateTime, default=func.now(), onupdate=func.now())
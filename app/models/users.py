@@ -1,19 +1,24 @@
-import json
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, func
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, func, Index, text
 from sqlalchemy.orm import relationship
 
-from app.core.security import get_password_hash
+from app.core.user_roles_enum import UserRoles
 from app.db.base import Base
 
 
 class Users(Base):
+    __table_args__ = (
+        # Back role filters like `roles & 2 <> 0` (all sellers)
+        Index("ix_users_buyers", "id", postgresql_where=text("roles & 1 <> 0"), sqlite_where=text("roles & 1 <> 0")),
+        Index("ix_users_sellers", "id", postgresql_where=text("roles & 2 <> 0"), sqlite_where=text("roles & 2 <> 0")),
+    )
+
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, nullable=False)
     full_name = Column(String)
-    roles = Column(String, nullable=False, default="buyer")  # Store roles as a JSON string
+    roles = Column(Integer, nullable=False, default=int(UserRoles.BUYER_ROLE))  # `UserRoles` bitmask
     hashed_password = Column(String, nullable=False)
     disabled = Column(Boolean, default=False)
 
@@ -24,10 +29,13 @@ class Users(Base):
     deposit = relationship("Deposits", back_populates="user")
 
     def __init__(
-            self, username: str, email: str, full_name: str, password: str, roles: list = None
+            self, username: str, email: str, full_name: str, hashed_password: str, roles: list = None
     ) -> None:
         self.username = username
         self.email = email
         self.full_name = full_name
-        self.roles = json.dumps(roles) if roles else json.dumps(["buyer"])  # Convert list to JSON string
-        self.hashed_password = get_password_hash(password=password)
+        self.roles = int(UserRoles.from_role_names(roles or [UserRoles.BUYER_ROLE.role_name]))
+        self.hashed_password = hashed_password
+
+    def has_role(self, role: UserRoles) -> bool:
+        return bool(self.roles & role)
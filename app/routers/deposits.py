@@ -13,12 +13,12 @@ router = APIRouter()
 @router.post("", response_model=Response[DepositsResponse])
 async def create_deposit(deposit: DepositInCreate, current_user: Users = Depends(get_current_user),
                          deposits_service: DepositsService = Depends()) -> Response:
-    deposit = deposits_service.create_deposit(deposit, current_user)
+    deposit = await deposits_service.create_deposit(deposit, current_user)
     return Response(data=deposit, message="Deposit successful")
 
 
 @router.post("/reset", response_model=Response[DepositResetResponse])
 async def reset_deposits(current_deposit: Deposits = Depends(get_current_deposit),
                          deposits_service: DepositsService = Depends()) -> Response:
-    deposit = deposits_service.reset_deposit(current_deposit)
-    return Response(data=deposit, message="Deposit reset successful")
+    refund = await deposits_service.reset_deposit(current_deposit)
+    return Response(data=refund, message="Deposit reset successful")
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+
+from app.core.metrics import RuntimeStatsCollector
+from app.db.repositories.products import product_cache
+from app.db.repositories.users import user_cache
+from app.db.session import get_pool_status
+
+router = APIRouter()
+
+REGISTRY.register(RuntimeStatsCollector(get_pool_status, [product_cache, user_cache]))
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -1,14 +1,17 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 
 from app.core.dependencies import get_current_user, get_current_product
 from app.core.pagination import Pagination, pagination_params
 from app.models.products import Products
 from app.models.users import Users
 from app.schemas.products import ProductResponse, ProductInCreate, ProductInUpdate, ProductDeleteResponse, \
-    ProductsPaginationResponse
+    ProductsPaginationResponse, ProductsInBulkCreate, ProductsBulkCreateResponse, ProductsImportFormatEnum, \
+    ProductsImportResponse
 from app.schemas.response import Response
+from app.schemas.sales import ProductSalesResponse
 from app.services.products import ProductsService
 
 router = APIRouter()
@@ -17,32 +20,68 @@ router = APIRouter()
 @router.post("", response_model=Response[ProductResponse])
 async def create_product(product: ProductInCreate, current_user: Users = Depends(get_current_user),
                          products_service: ProductsService = Depends()) -> Response:
-    product = products_service.create_product(product, current_user)
+    product = await products_service.create_product(product, current_user)
     return Response(data=product, message="Product created successfully")
 
 
+@router.post("/bulk", response_model=Response[ProductsBulkCreateResponse])
+async def create_products_in_bulk(products: ProductsInBulkCreate, current_user: Users = Depends(get_current_user),
+                                  products_service: ProductsService = Depends()) -> Response:
+    result = await products_service.create_products_in_bulk(products, current_user)
+    return Response(data=result, message="Products bulk creation completed")
+
+
+@router.post("/import", response_model=Response[ProductsImportResponse])
+async def import_products(request: Request,
+                          file_format: ProductsImportFormatEnum = Query(default=ProductsImportFormatEnum.CSV,
+                                                                        alias="format"),
+                          current_user: Users = Depends(get_current_user),
+                          products_service: ProductsService = Depends()) -> Response:
+    """
+    Imports products from the raw request body, CSV with `name,price,quantity` header or JSON lines.
+    """
+    result = await products_service.import_products(request.stream(), file_format, current_user)
+    return Response(data=result, message="Products import completed")
+
+
 @router.get("", response_model=Response[ProductsPaginationResponse])
 async def get_all_products(pagination: Pagination = Depends(pagination_params),
+                           exact_count: bool = Query(default=False, description="Count active products exactly "
+                                                                                 "instead of using the counter"),
                            products_service: ProductsService = Depends()) -> Response:
-    products = products_service.get_all_products(pagination)
+    products = await products_service.get_all_products(pagination, exact_count)
     return Response(data=products, message="Products fetched successfully")
 
 
 @router.get("/{product_id}", response_model=Response[ProductResponse])
 async def get_product(product_id: int, products_service: ProductsService = Depends()):
-    product = products_service.get_product_by_id(product_id)
+    product = await products_service.get_product_by_id(product_id)
     return Response(data=product, message="Product fetched successfully")
 
 
+@router.get("/{product_id}/sales", response_model=Response[ProductSalesResponse])
+async def get_product_sales(start_time: Optional[datetime] = Query(default=None, description="Inclusive lower bound "
+                                                                                            "of the UTC hour"),
+                            end_time: Optional[datetime] = Query(default=None, description="Exclusive upper bound "
+                                                                                          "of the UTC hour"),
+                            current_product: Products = Depends(get_current_product),
+                            products_service: ProductsService = Depends()) -> Response:
+    """
+    Returns hourly sales of the product to its seller.
+    """
+    sales = await products_service.get_product_sales(current_product, start_time, end_time)
+    return Response(data=sales, message="Product sales fetched successfully")
+
+
 @router.put("/{product_id}", response_model=Response[ProductResponse])
 async def update_product(product_in_update: ProductInUpdate, current_product: Products = Depends(get_current_product),
                          products_service: ProductsService = Depends()) -> Response:
-    product = products_service.update_product(product_in_update, current_product)
+    product = await products_service.update_product(product_in_update, current_product)
     return Response(data=product, message="Product updated successfully")
 
 
 @router.delete("/{product_id}", response_model=Response[ProductDeleteResponse])
 async def delete_product(product: Products = Depends(get_current_product),
                          products_service: ProductsService = Depends()) -> Response:
-    product = products_service.delete_product(product)
+    product = await products_service.delete_product(product)
     return Response(data=product, message=f"Product: {product.name} deleted successfully")
@@ -1,17 +1,44 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Optional
 
-from app.core.dependencies import get_current_deposit
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.dependencies import get_current_deposit, get_current_user
 from app.models.deposits import Deposits
-from app.schemas.purchases import PurchaseResponse, PurchaseInCreate
+from app.models.users import Users
+from app.schemas.purchases import PurchaseResponse, PurchaseInCreate, PurchasesExportFormatEnum, \
+    PurchasesExportRoleEnum
 from app.schemas.response import Response
 from app.services.purchases import PurchasesService
 
 router = APIRouter()
 
+EXPORT_MEDIA_TYPES = {
+    PurchasesExportFormatEnum.NDJSON: "application/x-ndjson",
+    PurchasesExportFormatEnum.CSV: "text/csv",
+}
+
 
 @router.post("", response_model=Response[PurchaseResponse])
 async def create_purchase(purchase: PurchaseInCreate,
                           current_deposit: Deposits = Depends(get_current_deposit),
                           purchase_service: PurchasesService = Depends()) -> Response:
-    purchases = purchase_service.buy_products(purchase, current_deposit)
+    purchases = await purchase_service.buy_products(purchase, current_deposit)
     return Response(data=purchases, message="Products purchase completed successfully")
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_purchases(role: PurchasesExportRoleEnum = PurchasesExportRoleEnum.BUYER,
+                           file_format: PurchasesExportFormatEnum = Query(default=PurchasesExportFormatEnum.NDJSON,
+                                                                          alias="format"),
+                           start_time: Optional[datetime] = None,
+                           end_time: Optional[datetime] = None,
+                           current_user: Users = Depends(get_current_user),
+                           purchase_service: PurchasesService = Depends()) -> StreamingResponse:
+    """
+    Streams purchases history of the current user, made as buyer or of own products as seller.
+    """
+    content = await purchase_service.export_purchases(current_user, role, file_format, start_time, end_time)
+    return StreamingResponse(content, media_type=EXPORT_MEDIA_TYPES[file_format], headers={
+        "Content-Disposition": f'attachment; filename="purchases.{file_format.value}"'})
@@ -16,7 +16,7 @@ async def create_user(user: UserInCreate, user_service: UserService = Depends())
     """
     Creates a new user in the database.
     """
-    user = user_service.register_user(user_create=user)
+    user = await user_service.register_user(user_create=user)
     return Response(data=user, message="User Registered successfully")
 
 
@@ -25,7 +25,7 @@ async def login_user(user: UserLogin, user_service: UserService = Depends()) ->
     """
     Process user login.
     """
-    token = user_service.login_user(user=user)
+    token = await user_service.login_user(user=user)
     return Response(data=token, message="The user authenticated successfully")
 
 
@@ -42,12 +42,12 @@ async def read_user(username: str, user: Users = Depends(get_current_user)) -> R
 @router.put("/{username}", response_model=Response[UserInDB])
 async def update_user(username: str, updated_user: UserInUpdate, current_user: Users = Depends(get_current_user),
                       user_service: UserService = Depends()) -> Response:
-    user = user_service.update_user(username, updated_user, current_user)
+    user = await user_service.update_user(username, updated_user, current_user)
     return Response(data=user, message="Successfully updated user")
 
 
 @router.delete("/{username}", response_model=Response[UserInDB])
 async def delete_user(username: str, current_user: Users = Depends(get_current_user),
                       user_service: UserService = Depends()) -> Response:
-    user = user_service.delete_user(username, current_user)
+    user = await user_service.delete_user(username, current_user)
     return Response(data=user, message="User deleted successfully")
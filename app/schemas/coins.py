@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+
+class CoinsInCreate(BaseModel):
+    ...
+
+
+class CoinsInUpdate(BaseModel):
+    ...
@@ -1,5 +1,3 @@
-import json
-
 from fastapi import status
 from pydantic import BaseModel, Field, field_validator
 
@@ -32,14 +30,6 @@ class Deposits(BaseModel):
                                                    {"value": 100, "quantity": 1}]}
                                    )
 
-    @field_validator('coins', mode='before')
-    def convert_coins_to_list(cls, v) -> list:
-        if isinstance(v, str):
-            coins_list = json.loads(v)
-            coins_items = [CoinsItem.from_dict(coin_dict) for coin_dict in coins_list]
-            return coins_items
-        return v
-
 
 class DepositInCreate(Deposits):
     ...
@@ -49,8 +39,12 @@ class DepositInUpdate(Deposits):
     ...
 
 
-class DepositResetResponse(BaseModel):
-    ...
+class DepositResetResponse(Deposits):
+    total_refund_amount: float
+
+    class Config:
+        json_schema_extra = {"example": {"total_refund_amount": 1.50,
+                                         "coins": [{"value": 50, "quantity": 1}, {"value": 100, "quantity": 1}]}}
 
 
 class DepositsResponse(Deposits):
@@ -1,16 +1,32 @@
+import math
+from enum import Enum
 from typing import Optional, List
 
 from fastapi import status
-from pydantic import BaseModel, Field, field_validator, root_validator, model_validator
+from pydantic import BaseModel, Field, field_validator, root_validator, model_validator, computed_field
 
+from app.core.constants import MAX_PRODUCT_PRICE
 from app.core.exceptions import InvalidInputDataException
+from app.core.money import to_cents, to_dollars
+
+
+def check_price_range(v):
+    """
+    Reject infinite, NaN and too high prices before the field constraints, so they are reported as bad input.
+    """
+    if isinstance(v, (int, float)) and not (math.isfinite(v) and v <= MAX_PRODUCT_PRICE):
+        raise InvalidInputDataException(message=f"Price must be a finite number up to {MAX_PRODUCT_PRICE}",
+                                        status_code=status.HTTP_400_BAD_REQUEST)
+    return v
 
 
 class Product(BaseModel):
     name: str = Field(title="Product Name", strict=True, min_length=1, max_length=100)
-    price: float = Field(title="Product Price", strict=True, ge=0.01)
+    price: float = Field(title="Product Price", strict=True, ge=0.01, le=MAX_PRODUCT_PRICE, allow_inf_nan=False)
     quantity: int = Field(title="Product Quantity", strict=True, gt=0)
 
+    _check_price_range = field_validator('price', mode='before')(check_price_range)
+
     @field_validator('price')
     def validate_price(cls, v):
         if round(v, 2) != v:
@@ -18,6 +34,10 @@ class Product(BaseModel):
                                             status_code=status.HTTP_400_BAD_REQUEST)
         return v
 
+    @property
+    def price_cents(self) -> Optional[int]:
+        return to_cents(self.price) if self.price is not None else None
+
 
 class ProductInCreate(Product):
     ...
@@ -25,7 +45,8 @@ class ProductInCreate(Product):
 
 class ProductInUpdate(Product):
     name: Optional[str] = Field(None, title="Product Name", strict=True, min_length=1, max_length=100)
-    price: Optional[float] = Field(None, title="Product Price", strict=True, ge=0.01)
+    price: Optional[float] = Field(None, title="Product Price", strict=True, ge=0.01, le=MAX_PRODUCT_PRICE,
+                                   allow_inf_nan=False)
     quantity: Optional[int] = Field(None, title="Product Quantity", strict=True, gt=0)
 
     @field_validator('price', mode='after')
@@ -44,32 +65,88 @@ class ProductInUpdate(Product):
         return self
 
 
-class ProductResponse(Product):
+class ProductItem(BaseModel):
     id: int = Field(title="Product ID")
     name: str = Field(title="Product Name")
-    price: float = Field(title="Product Price")
+    price_cents: int = Field(title="Product Price in cents", exclude=True)
     quantity: int = Field(title="Product Quantity")
 
+    @computed_field(title="Product Price")
+    @property
+    def price(self) -> float:
+        return to_dollars(self.price_cents)
+
+
+class ProductResponse(ProductItem):
     class Config:
         json_schema_extra = {
             "example": {"id": 22, "name": "lays", "price": 1.5, "quantity": 5}}
 
 
-class ProductItem(BaseModel):
-    id: int = Field(title="Product ID")
-    name: str = Field(title="Product Name")
-    price: float = Field(title="Product Price")
-    quantity: int = Field(title="Product Quantity")
-
-
 class ProductsPaginationResponse(BaseModel):
     count: int
     products: List[ProductItem]
+    next_cursor: Optional[str] = Field(None, title="Cursor of the next page")
+    previous_cursor: Optional[str] = Field(None, title="Cursor of the previous page")
 
     class Config:
         json_schema_extra = {
             "example": {"count": 5, "products": [{"id": 22, "name": "lays", "price": 1.5, "quantity": 5},
-                                                 {"id": 23, "name": "bingo", "price": 1.5, "quantity": 5}]}}
+                                                 {"id": 23, "name": "bingo", "price": 1.5, "quantity": 5}],
+                        "next_cursor": "WyIyMDI0LTAzLTEwVDEwOjAwOjAwIiwyMywibmV4dCJd", "previous_cursor": None}}
+
+
+class ProductsInBulkCreate(BaseModel):
+    products: List[ProductInCreate] = Field(title="Products to create", min_length=1, max_length=5000)
+
+    class Config:
+        json_schema_extra = {
+            "example": {"products": [{"name": "lays", "price": 1.5, "quantity": 5},
+                                     {"name": "bingo", "price": 1.5, "quantity": 5}]}}
+
+
+class ProductBulkItemResult(BaseModel):
+    index: int = Field(title="Position of the product in the request")
+    name: str = Field(title="Product Name")
+    success: bool
+    id: Optional[int] = Field(None, title="Product ID")
+    error: Optional[str] = None
+
+
+class ProductsBulkCreateResponse(BaseModel):
+    created_count: int
+    failed_count: int
+    results: List[ProductBulkItemResult]
+
+    class Config:
+        json_schema_extra = {
+            "example": {"created_count": 1, "failed_count": 1,
+                        "results": [{"index": 0, "name": "lays", "success": True, "id": 22},
+                                    {"index": 1, "name": "bingo", "success": False,
+                                     "error": "Product with name: `bingo` already exists"}]}}
+
+
+class ProductsImportFormatEnum(Enum):
+    CSV = "csv"
+    JSONL = "jsonl"
+
+
+class ProductImportError(BaseModel):
+    line: int = Field(title="Line number in the imported file")
+    error: str
+
+
+class ProductsImportResponse(BaseModel):
+    total_rows: int
+    created_count: int
+    skipped_count: int = Field(title="Valid rows skipped because the product name is already used")
+    failed_count: int
+    errors: List[ProductImportError] = Field(title="First errors of the invalid rows")
+
+    class Config:
+        json_schema_extra = {
+            "example": {"total_rows": 3, "created_count": 1, "skipped_count": 1, "failed_count": 1,
+                        "errors": [{"line": 3, "error": "`quantity` Input should be greater than 0"}]}}
 
 
 class ProductDeleteResponse(BaseModel):
@@ -1,3 +1,4 @@
+from enum import Enum
 from typing import List
 
 from pydantic import BaseModel, Field
@@ -68,3 +69,13 @@ class PurchaseResponse(BaseModel):
                 ]  # Change in cents (e.g., 10 cents and 5 cents)
             }
         }
+
+
+class PurchasesExportFormatEnum(Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class PurchasesExportRoleEnum(Enum):
+    BUYER = "buyer"
+    SELLER = "seller"
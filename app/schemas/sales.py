@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel, Field, computed_field
+
+from app.core.money import to_dollars
+
+
+class SalesInCreate(BaseModel):
+    ...
+
+
+class SalesInUpdate(BaseModel):
+    ...
+
+
+class SalesBucket(BaseModel):
+    bucket_time: datetime = Field(title="Start of the UTC hour")
+    units: int = Field(title="Units sold in the hour")
+    revenue_cents: int = Field(title="Revenue of the hour in cents", exclude=True)
+
+    @computed_field(title="Revenue of the hour")
+    @property
+    def revenue(self) -> float:
+        return to_dollars(self.revenue_cents)
+
+
+class ProductSalesResponse(BaseModel):
+    product_id: int
+    total_units: int
+    total_revenue: float
+    buckets: List[SalesBucket]
+
+    class Config:
+        json_schema_extra = {
+            "example": {"product_id": 22, "total_units": 7, "total_revenue": 10.5,
+                        "buckets": [{"bucket_time": "2024-03-10T10:00:00", "units": 3, "revenue": 4.5},
+                                    {"bucket_time": "2024-03-10T12:00:00", "units": 4, "revenue": 6.0}]}}
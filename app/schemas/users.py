@@ -1,4 +1,3 @@
-import json
 from typing import Optional, List
 
 from fastapi import status
@@ -6,6 +5,7 @@ from pydantic import ConfigDict, BaseModel, EmailStr, field_validator, Field, mo
 
 from app.core.constants import ALLOWED_USER_ROLES
 from app.core.exceptions import InvalidInputDataException
+from app.core.user_roles_enum import UserRoles
 
 
 class User(BaseModel):
@@ -89,8 +89,8 @@ class UserInDB(User):
 
     @field_validator('roles', mode="before")
     def convert_roles_to_list(cls, v) -> list:
-        if isinstance(v, str):
-            return json.loads(v)
+        if isinstance(v, int):
+            return UserRoles(v).to_role_names()
         return v
 
     class Config:
@@ -1,49 +1,57 @@
-from typing import List
+from typing import Dict, List
 
 from fastapi import Depends, status
-from pydantic import parse_obj_as
 
-from app.core.exceptions import UserPermissionException, DepositsAlreadyExistsException
+from app.core.change import change_maker
+from app.core.config import get_app_settings
+from app.core.exceptions import UserPermissionException, DepositsAlreadyExistsException, \
+    InvalidInputDataException, ExactChangeNotAvailableException
+from app.core.money import to_dollars
 from app.core.user_roles_enum import UserRoles
+from app.db.repositories.coins import CoinsRepository, get_coins_repository
 from app.db.repositories.deposits import DepositsRepository, get_deposits_repository
-from app.db.utils import model_to_dict
 from app.models.deposits import Deposits
 from app.models.users import Users
-from app.schemas.deposits import DepositInCreate, DepositsResponse, CoinsItem
+from app.schemas.deposits import DepositInCreate, DepositsResponse, CoinsItem, DepositResetResponse
+
+settings = get_app_settings()
 
 
 class DepositsService:
     def __init__(
-            self, deposits_repo: DepositsRepository = Depends(get_deposits_repository)
+            self, deposits_repo: DepositsRepository = Depends(get_deposits_repository),
+            coins_repo: CoinsRepository = Depends(get_coins_repository)
     ) -> None:
         self.deposits_repo = deposits_repo
+        self.coins_repo = coins_repo
 
     @staticmethod
     def is_current_user_buyer(user: Users) -> bool:
-        return UserRoles.BUYER_ROLE.value in user.roles
+        return user.has_role(UserRoles.BUYER_ROLE)
 
-    def handle_not_utilized_deposits(self, user: Users) -> None:
+    @staticmethod
+    def get_total_deposit_amount(coin_quantities: Dict[int, int]) -> int:
         """
-        Handles not utilized deposits exists for the current user and raises an exception
-        :param user:
-        :return:
+        Returns total deposit amount in cents
         """
-        not_utilized_deposit = self.deposits_repo.get_not_utilized_deposits_by_user(user.id)
-        if not_utilized_deposit:
-            raise DepositsAlreadyExistsException(message=f"Deposits already exists for user {user.username}",
-                                                 status_code=status.HTTP_400_BAD_REQUEST)
+        return sum(coin * quantity for coin, quantity in coin_quantities.items())
 
     @staticmethod
-    def get_total_deposit_amount(coins: List[CoinsItem]) -> float:
-        total_amount_in_cents = 0
+    def get_coin_quantities(coins: List[CoinsItem]) -> Dict[int, int]:
+        """
+        Returns coin value to total quantity map of the deposited coins
+        :param coins:
+        :return:
+        """
+        coin_quantities = {}
         for coin_item in coins:
-            total_amount_in_cents += coin_item.value * coin_item.quantity
-        total_amount_in_dollars = round(total_amount_in_cents / 100.0, 2)
-        return total_amount_in_dollars
+            coin_quantities[coin_item.value] = coin_quantities.get(coin_item.value, 0) + coin_item.quantity
+        return coin_quantities
 
-    def create_deposit(self, deposit_in_create: DepositInCreate, current_user: Users) -> DepositsResponse:
+    async def create_deposit(self, deposit_in_create: DepositInCreate, current_user: Users) -> DepositsResponse:
         """
-        Creates a new deposit for the current user
+        Creates a new deposit for the current user. The database allows one not utilized deposit per user,
+        so an existing one is detected by the insert itself. Deposits are limited to `change_table_max_cents`.
         :param deposit_in_create:
         :param current_user:
         :return:
@@ -51,20 +59,45 @@ class DepositsService:
         if not self.is_current_user_buyer(current_user):
             raise UserPermissionException(message="Only users with buyer permission can deposit",
                                           status_code=status.HTTP_403_FORBIDDEN)
-        self.handle_not_utilized_deposits(current_user)
-        total_deposit_amount = self.get_total_deposit_amount(deposit_in_create.coins)
-        deposit_obj = self.deposits_repo.create_deposit_with_total_amount(deposit_in_create, current_user.id,
-                                                                          total_deposit_amount)
-        deposit_dict = model_to_dict(deposit_obj)
-        deposit_dict["total_deposit_amount"] = total_deposit_amount
-        deposit = parse_obj_as(DepositsResponse, deposit_dict)
-        return deposit
+        coin_quantities = self.get_coin_quantities(deposit_in_create.coins)
+        total_deposit_amount = self.get_total_deposit_amount(coin_quantities)
+        # Change of every deposit is looked up in the precomputed change table
+        if total_deposit_amount > settings.change_table_max_cents:
+            raise InvalidInputDataException(
+                message=f"Deposit amount must not exceed ${to_dollars(settings.change_table_max_cents)}",
+                status_code=status.HTTP_400_BAD_REQUEST)
+        try:
+            deposit_obj = await self.deposits_repo.create_not_utilized_deposit(coin_quantities, current_user.id,
+                                                                               total_deposit_amount)
+            if deposit_obj is None:
+                raise DepositsAlreadyExistsException(
+                    message=f"Deposits already exists for user {current_user.username}",
+                    status_code=status.HTTP_400_BAD_REQUEST)
+            await self.coins_repo.add_coins(coin_quantities)
+            await self.deposits_repo.db.commit()
+        except Exception:
+            await self.deposits_repo.db.rollback()
+            raise
+        return DepositsResponse(coins=deposit_obj.coins, total_deposit_amount=to_dollars(total_deposit_amount))
 
-    def reset_deposit(self, deposit: Deposits) -> Deposits:
+    async def reset_deposit(self, deposit: Deposits) -> DepositResetResponse:
         """
-        Resets/Deletes the existing deposit
+        Resets/Deletes the existing deposit and gives its amount back. The deposited coins may have been given out
+        as change already, so the refund is paid with the minimum number of coins the machine holds.
         :param deposit:
-        :return:
+        :return: refunded coins
         """
-        deposit = self.deposits_repo.delete(deposit.id)
-        return deposit
+        try:
+            refund = change_maker.make_change(deposit.amount_cents, await self.coins_repo.get_coin_supply())
+            if refund is None or not await self.coins_repo.take_coins(refund):
+                raise ExactChangeNotAvailableException(
+                    message=f"The machine can't refund exact amount of ${to_dollars(deposit.amount_cents)}, "
+                            "please buy products with the deposit",
+                    status_code=status.HTTP_409_CONFLICT)
+            await self.deposits_repo.delete(deposit.id)
+        except Exception:
+            await self.deposits_repo.db.rollback()
+            raise
+        return DepositResetResponse(coins=[{"value": coin, "quantity": quantity}
+                                           for coin, quantity in sorted(refund.items())],
+                                    total_refund_amount=to_dollars(deposit.amount_cents))
@@ -1,52 +1,213 @@
-from typing import List
+import codecs
+import csv
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
 
 from fastapi import Depends, status
+from pydantic import ValidationError
 
-from app.core.exceptions import UserPermissionException, ProductAlreadyExistsException, ProductNotFoundException
+from app.core.config import get_app_settings
+from app.core.exceptions import UserPermissionException, ProductNotFoundException, \
+    BaseInternalException, InvalidInputDataException, form_error_message
 from app.core.logging import logger
-from app.core.pagination import Pagination
+from app.core.money import to_dollars
+from app.core.pagination import Pagination, CursorDirectionEnum, encode_cursor
 from app.core.user_roles_enum import UserRoles
 from app.db.repositories.products import ProductsRepository, get_products_repository
 from app.db.repositories.purchases import PurchasesRepository, get_purchases_repository
+from app.db.repositories.sales import SalesRepository, get_sales_repository
 from app.models.products import Products
 from app.models.users import Users
-from app.schemas.products import ProductInCreate, ProductInUpdate
+from app.schemas.products import ProductInCreate, ProductInUpdate, ProductsInBulkCreate, ProductsImportFormatEnum
+
+settings = get_app_settings()
+
+
+async def iter_lines(body: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Decode streamed UTF-8 body into lines without reading it whole.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for data in body:
+        pending += decoder.decode(data)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def parse_csv_product(line: str, header: List[str]) -> ProductInCreate:
+    row = dict(zip(header, next(csv.reader([line]))))
+    return ProductInCreate(name=row.get("name"), price=float(row["price"]), quantity=int(row["quantity"]))
+
+
+def parse_jsonl_product(line: str) -> ProductInCreate:
+    row = json.loads(line)
+    if not isinstance(row, dict):
+        raise ValueError("Row must be a JSON object")
+    return ProductInCreate(**row)
 
 
 class ProductsService:
     def __init__(
             self, products_repo: ProductsRepository = Depends(get_products_repository),
-            purchases_repo: PurchasesRepository = Depends(get_purchases_repository)
+            purchases_repo: PurchasesRepository = Depends(get_purchases_repository),
+            sales_repo: SalesRepository = Depends(get_sales_repository)
     ) -> None:
         self.products_repo = products_repo
         self.purchases_repo = purchases_repo
+        self.sales_repo = sales_repo
 
     @staticmethod
     def is_current_user_seller(current_user: Users) -> bool:
-        return UserRoles.SELLER_ROLE.value in current_user.roles
-
-    def handle_product_with_same_name(self, product_name: str) -> None:
-        logger.info(f"Try to find product: {product_name}")
-        product = self.products_repo.get_product_by_name(product_name=product_name)
-        if product:
-            raise ProductAlreadyExistsException(message=f"Product with name: `{product_name}` already exists",
-                                                status_code=status.HTTP_400_BAD_REQUEST)
+        return current_user.has_role(UserRoles.SELLER_ROLE)
 
-    def create_product(self, product_create: ProductInCreate, current_user: Users) -> Products:
+    async def create_product(self, product_create: ProductInCreate, current_user: Users) -> Products:
         if not self.is_current_user_seller(current_user):
             raise UserPermissionException(message="Only seller can create products",
                                           status_code=status.HTTP_403_FORBIDDEN)
-        self.handle_product_with_same_name(product_create.name)
-        product = self.products_repo.create_with_user(product_create, current_user.id)
+        product = await self.products_repo.create_with_user(product_create, current_user.id)
         return product
 
-    def get_all_products(self, pagination: Pagination) -> dict:
-        limit = pagination.page * pagination.per_page
-        offset = (pagination.page - 1) * pagination.per_page
-        return self.products_repo.get_all_active_paginated_products(limit, offset, pagination.order)
+    async def create_products_in_bulk(self, products_create: ProductsInBulkCreate, current_user: Users) -> dict:
+        """
+        Creates all products with unique names in one transaction and reports the result of every item
+        :param products_create:
+        :param current_user:
+        :return:
+        """
+        if not self.is_current_user_seller(current_user):
+            raise UserPermissionException(message="Only seller can create products",
+                                          status_code=status.HTTP_403_FORBIDDEN)
+        existing_names = await self.products_repo.get_existing_product_names(
+            {product.name for product in products_create.products})
+        results, products_to_create, requested_names = [], [], set()
+        for index, product in enumerate(products_create.products):
+            if product.name in existing_names:
+                error = f"Product with name: `{product.name}` already exists"
+            elif product.name in requested_names:
+                error = f"Product with name: `{product.name}` is repeated in the request"
+            else:
+                error = None
+                requested_names.add(product.name)
+                products_to_create.append(product)
+            results.append({"index": index, "name": product.name, "success": error is None, "error": error})
+
+        logger.info(f"Creating {len(products_to_create)} products in bulk")
+        created_products = await self.products_repo.create_many_with_user(
+            products_to_create, current_user.id) if products_to_create else []
+        created_results = (result for result in results if result["success"])
+        for result, product in zip(created_results, created_products):
+            result["id"] = product.id
+        return {
+            "created_count": len(created_products),
+            "failed_count": len(results) - len(created_products),
+            "results": results,
+        }
 
-    def get_product_by_id(self, product_id: int) -> Products:
-        product = self.products_repo.get(product_id)
+    async def import_products(self, body: AsyncIterator[bytes], file_format: ProductsImportFormatEnum,
+                              current_user: Users) -> dict:
+        """
+        Imports products from streamed CSV (with `name,price,quantity` header) or JSON lines body.
+        Rows are validated and loaded in chunks, so memory use does not depend on the body size.
+        Every chunk is committed on its own, a failed import keeps the products of the committed chunks.
+        :param body:
+        :param file_format:
+        :param current_user:
+        :return:
+        """
+        if not self.is_current_user_seller(current_user):
+            raise UserPermissionException(message="Only seller can create products",
+                                          status_code=status.HTTP_403_FORBIDDEN)
+        report = {"total_rows": 0, "valid_rows": 0, "failed_count": 0, "errors": []}
+
+        async def parse_chunks() -> AsyncIterator[List[ProductInCreate]]:
+            header: Optional[List[str]] = None
+            chunk: List[ProductInCreate] = []
+            line_number = 0
+            async for line in iter_lines(body):
+                line_number += 1
+                if not line.strip():
+                    continue
+                if file_format == ProductsImportFormatEnum.CSV and header is None:
+                    header = [column.strip() for column in next(csv.reader([line]))]
+                    continue
+                report["total_rows"] += 1
+                try:
+                    if file_format == ProductsImportFormatEnum.CSV:
+                        chunk.append(parse_csv_product(line, header))
+                    else:
+                        chunk.append(parse_jsonl_product(line))
+                except ValidationError as exc:
+                    self._add_import_error(report, line_number, "; ".join(form_error_message(exc.errors())))
+                    continue
+                except BaseInternalException as exc:
+                    self._add_import_error(report, line_number, exc.message)
+                    continue
+                except (ValueError, KeyError, TypeError) as exc:
+                    self._add_import_error(report, line_number, f"Invalid row: {exc}")
+                    continue
+                report["valid_rows"] += 1
+                if len(chunk) >= settings.product_import_chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+        try:
+            created_count = await self.products_repo.import_with_user(parse_chunks(), current_user.id)
+        except UnicodeDecodeError:
+            raise InvalidInputDataException(message="Imported file must be UTF-8 encoded",
+                                            status_code=status.HTTP_400_BAD_REQUEST)
+        logger.info(f"Imported {created_count} products from {report['total_rows']} rows")
+        return {
+            "total_rows": report["total_rows"],
+            "created_count": created_count,
+            "skipped_count": report["valid_rows"] - created_count,
+            "failed_count": report["failed_count"],
+            "errors": report["errors"],
+        }
+
+    @staticmethod
+    def _add_import_error(report: dict, line_number: int, error: str) -> None:
+        report["failed_count"] += 1
+        if len(report["errors"]) < settings.product_import_max_errors:
+            report["errors"].append({"line": line_number, "error": error})
+
+    async def get_all_products(self, pagination: Pagination, exact_count: bool = False) -> dict:
+        """
+        Returns page of active products with cursors of the neighbouring pages.
+        Pages are fetched with keyset pagination when a cursor is passed, otherwise with `page` offset.
+        `count` comes from the maintained counter unless `exact_count` is requested.
+        """
+        per_page, cursor = pagination.per_page, pagination.cursor
+        backwards = cursor is not None and cursor.direction == CursorDirectionEnum.PREVIOUS
+        if cursor:
+            products = await self.products_repo.get_all_active_products_by_cursor(per_page + 1, pagination.order,
+                                                                                  cursor)
+        else:
+            offset = (pagination.page - 1) * pagination.per_page
+            products = await self.products_repo.get_all_active_paginated_products(per_page + 1, offset,
+                                                                                  pagination.order)
+        has_more = len(products) > per_page
+        products = products[-per_page:] if backwards else products[:per_page]
+        has_next = True if backwards else has_more
+        has_previous = has_more if backwards else bool(cursor) or pagination.page > 1
+        return {
+            'count': await self.products_repo.count_active_products(exact=exact_count),
+            'products': products,
+            'next_cursor': encode_cursor(products[-1].created_time, products[-1].id, CursorDirectionEnum.NEXT)
+            if has_next and products else None,
+            'previous_cursor': encode_cursor(products[0].created_time, products[0].id, CursorDirectionEnum.PREVIOUS)
+            if has_previous and products else None,
+        }
+
+    async def get_product_by_id(self, product_id: int) -> Products:
+        product = await self.products_repo.get(product_id)
         if not product or not product.is_active:
             raise ProductNotFoundException(
                 message=f"Product with id `{product_id}` not found or inactive.",
@@ -54,13 +215,24 @@ class ProductsService:
             )
         return product
 
-    def update_product(self, product_in_update: ProductInUpdate, current_product: Products) -> Products:
-        if product_in_update.name != current_product.name:
-            self.handle_product_with_same_name(product_in_update.name)
-        return self.products_repo.update(obj=current_product, obj_update=product_in_update)
+    async def get_product_sales(self, product: Products, start_time: Optional[datetime],
+                                end_time: Optional[datetime]) -> dict:
+        """
+        Returns hourly units sold and revenue of the product, read from the sales rollup only.
+        """
+        buckets = await self.sales_repo.get_product_sales(product.id, start_time, end_time)
+        return {
+            'product_id': product.id,
+            'total_units': sum(bucket.units for bucket in buckets),
+            'total_revenue': to_dollars(sum(bucket.revenue_cents for bucket in buckets)),
+            'buckets': buckets,
+        }
+
+    async def update_product(self, product_in_update: ProductInUpdate, current_product: Products) -> Products:
+        return await self.products_repo.update(obj=current_product, obj_update=product_in_update)
 
-    def delete_product(self, product: Products) -> Products:
-        if self.purchases_repo.are_purchases_exists_for_product(product.id):
-            return self.products_repo.update_product_as_inactive(product.id)
+    async def delete_product(self, product: Products) -> Products:
+        if await self.purchases_repo.are_purchases_exists_for_product(product.id):
+            return await self.products_repo.update_product_as_inactive(product.id)
         else:
-            return self.products_repo.delete(product.id)
+            return await self.products_repo.delete(product.id)
@@ -1,84 +1,170 @@
-from typing import List
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Sequence
 
 from fastapi import Depends, status
 from pydantic import parse_obj_as
+from sqlalchemy import Row
 
-from app.core.constants import ALLOWED_CENT_COINS
-from app.core.exceptions import InvalidInputDataException
+from app.core.change import change_maker
+from app.core.config import get_app_settings
+from app.core.exceptions import InvalidInputDataException, DepositsNotExistsException, UserPermissionException, \
+    ExactChangeNotAvailableException
+from app.core.money import to_dollars
+from app.core.user_roles_enum import UserRoles
+from app.db.repositories.coins import CoinsRepository, get_coins_repository
 from app.db.repositories.deposits import DepositsRepository, get_deposits_repository
 from app.db.repositories.products import ProductsRepository, get_products_repository
 from app.db.repositories.purchases import get_purchases_repository, PurchasesRepository
+from app.db.repositories.sales import SalesRepository, get_sales_repository
 from app.models.deposits import Deposits
-from app.models.products import Products
-from app.schemas.purchases import PurchaseInCreate, PurchaseResponse, PurchaseItem
+from app.models.users import Users
+from app.schemas.purchases import PurchaseInCreate, PurchaseResponse, PurchaseItem, PurchasesExportFormatEnum, \
+    PurchasesExportRoleEnum
+
+settings = get_app_settings()
+
+PURCHASES_EXPORT_COLUMNS = ["id", "created_time", "product_id", "product_name", "quantity", "total_spent", "deposit_id"]
 
 
 class PurchasesService:
     def __init__(
             self, purchases_repo: PurchasesRepository = Depends(get_purchases_repository),
             products_repo: ProductsRepository = Depends(get_products_repository),
-            deposits_repo: DepositsRepository = Depends(get_deposits_repository)
+            deposits_repo: DepositsRepository = Depends(get_deposits_repository),
+            sales_repo: SalesRepository = Depends(get_sales_repository),
+            coins_repo: CoinsRepository = Depends(get_coins_repository)
     ) -> None:
         self.purchases_repo = purchases_repo
         self.products_repo = products_repo
         self.deposits_repo = deposits_repo
+        self.sales_repo = sales_repo
+        self.coins_repo = coins_repo
 
-    def handle_products(self, products: List[PurchaseItem],
-                        deposit_amount: float) -> tuple[List[Products], float, dict]:
-        product_ids = {product_item.product_id for product_item in products}
-        products_list = self.products_repo.get_active_products_by_product_ids(list(product_ids))
-        if len(products_list) != len(product_ids):
+    async def handle_products(self, products: List[PurchaseItem],
+                              deposit_amount_cents: int) -> tuple[dict, int, dict]:
+        """
+        Locks the purchased products and validates the requested quantities and deposit amount
+        :param products:
+        :param deposit_amount_cents:
+        :return: product id to purchased quantity map, remaining change in cents and product id to price in cents map
+        """
+        product_id_purchase_quantity_map = {}
+        for product_item in products:
+            product_id = product_item.product_id
+            product_id_purchase_quantity_map[product_id] = (product_id_purchase_quantity_map.get(product_id, 0)
+                                                            + product_item.quantity)
+        products_list = await self.products_repo.get_active_products_by_product_ids(
+            list(product_id_purchase_quantity_map), lock=True)
+        if len(products_list) != len(product_id_purchase_quantity_map):
             raise InvalidInputDataException(message="some of the provided product ids not exists",
                                             status_code=status.HTTP_400_BAD_REQUEST)
         product_id_price_map, product_id_quantity_map = {}, {}
         for product in products_list:
-            product_id_price_map[product.id] = product.price
+            product_id_price_map[product.id] = product.price_cents
             product_id_quantity_map[product.id] = product.quantity
         products_amount = 0
-        for product_item in products:
-            product_id = product_item.product_id
-            product_quantity = product_item.quantity
+        for product_id, product_quantity in product_id_purchase_quantity_map.items():
             if product_quantity < 0 or product_quantity > product_id_quantity_map.get(product_id):
                 raise InvalidInputDataException(message=f"Invalid quantity passed for product_id: {product_id}, "
                                                         f"available quantity: {product_id_quantity_map.get(product_id)}",
                                                 status_code=status.HTTP_400_BAD_REQUEST)
             products_amount += (product_id_price_map[product_id] * product_quantity)
 
-        if products_amount > deposit_amount:
+        if products_amount > deposit_amount_cents:
             raise InvalidInputDataException(
-                message=f"The deposited Amount: ${deposit_amount} is less than selected products "
-                        f"amount: ${products_amount}",
+                message=f"The deposited Amount: ${to_dollars(deposit_amount_cents)} is less than selected products "
+                        f"amount: ${to_dollars(products_amount)}",
                 status_code=status.HTTP_400_BAD_REQUEST)
-        remaining_change = round(deposit_amount - products_amount, 2)
-        return products_list, remaining_change, product_id_price_map
+        return product_id_purchase_quantity_map, deposit_amount_cents - products_amount, product_id_price_map
 
-    @staticmethod
-    def get_remaining_coin_count(remaining_change: float):
+    async def get_remaining_coins(self, remaining_change_cents: int) -> dict:
         """
-        Returns the remaining change in the form of coin count
-        :param remaining_change:
+        Returns coin value to quantity map paying the remaining change with the minimum number of machine coins
+        :param remaining_change_cents:
         :return:
         """
-        remaining_change_in_cents = remaining_change * 100
-        coin_count = []
+        change = change_maker.make_change(remaining_change_cents, await self.coins_repo.get_coin_supply())
+        if change is None:
+            raise ExactChangeNotAvailableException(
+                message=f"The machine can't give exact change of ${to_dollars(remaining_change_cents)}, "
+                        "please deposit exact amount",
+                status_code=status.HTTP_409_CONFLICT)
+        return change
 
-        for coin in ALLOWED_CENT_COINS:
-            count = remaining_change_in_cents // coin
-            if count > 0:
-                coin_count.append({"value": coin, "quantity": int(count)})
-                remaining_change_in_cents %= coin
-
-        return coin_count
-
-    def buy_products(self, purchase: PurchaseInCreate, current_deposit: Deposits) -> PurchaseResponse:
-        products_list, remaining_change, product_id_price_map = self.handle_products(purchase.products,
-                                                                                     current_deposit.amount)
-        self.purchases_repo.create_product_purchases(purchase, product_id_price_map, current_deposit.id)
-        self.deposits_repo.update_deposit_as_utilized(current_deposit.id)
-        self.products_repo.update_product_quantities(purchase, products_list)
+    async def buy_products(self, purchase: PurchaseInCreate, current_deposit: Deposits) -> PurchaseResponse:
+        """
+        Buys the products with the current deposit in a single transaction.
+        The change is chosen from the machine coins before any write, so purchases without exact change
+        are rejected early.
+        :param purchase:
+        :param current_deposit:
+        :return:
+        """
+        try:
+            product_id_quantity_map, remaining_change_cents, product_id_price_map = await self.handle_products(
+                purchase.products, current_deposit.amount_cents)
+            change = await self.get_remaining_coins(remaining_change_cents)
+            if not await self.deposits_repo.update_deposit_as_utilized(current_deposit.id):
+                raise DepositsNotExistsException(message="Deposits not found", status_code=status.HTTP_404_NOT_FOUND)
+            if not await self.products_repo.update_product_quantities(product_id_quantity_map):
+                raise InvalidInputDataException(message="Products are out of stock, please try again",
+                                                status_code=status.HTTP_409_CONFLICT)
+            if not await self.coins_repo.take_coins(change):
+                raise ExactChangeNotAvailableException(message="Change coins are not available, please try again",
+                                                       status_code=status.HTTP_409_CONFLICT)
+            await self.purchases_repo.create_product_purchases(purchase, product_id_price_map, current_deposit.id)
+            sales_hour = datetime.now(timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+            await self.sales_repo.add_product_sales(product_id_quantity_map, product_id_price_map, sales_hour)
+            await self.purchases_repo.db.commit()
+        except Exception:
+            await self.purchases_repo.db.rollback()
+            raise
         result_json = purchase.dict(exclude_unset=True)
-        result_json['total_spent'] = round(current_deposit.amount - remaining_change, 2)
-        remaining_change_coins = self.get_remaining_coin_count(remaining_change)
-        result_json["change"] = remaining_change_coins
+        result_json['total_spent'] = to_dollars(current_deposit.amount_cents - remaining_change_cents)
+        result_json["change"] = [{"value": coin, "quantity": quantity} for coin, quantity in sorted(change.items())]
         purchase_response = parse_obj_as(PurchaseResponse, result_json)
         return purchase_response
+
+    async def export_purchases(self, current_user: Users, role: PurchasesExportRoleEnum,
+                               file_format: PurchasesExportFormatEnum, start_time: Optional[datetime],
+                               end_time: Optional[datetime]) -> AsyncIterator[str]:
+        """
+        Returns streamed purchases history of the current user as buyer or seller
+        :param current_user:
+        :param role: export purchases made by the user (buyer) or of the user products (seller)
+        :param file_format:
+        :param start_time: inclusive lower bound of the purchase time
+        :param end_time: exclusive upper bound of the purchase time
+        :return:
+        """
+        if not current_user.has_role(UserRoles.from_role_names([role.value])):
+            raise UserPermissionException(message=f"Only users with {role.value} permission can export these purchases",
+                                          status_code=status.HTTP_403_FORBIDDEN)
+        batches = self.purchases_repo.stream_purchases_for_user(
+            current_user.id, role == PurchasesExportRoleEnum.SELLER, start_time, end_time,
+            settings.purchases_export_batch_size)
+        return self.serialize_purchases(batches, file_format)
+
+    @staticmethod
+    async def serialize_purchases(batches: AsyncIterator[Sequence[Row]],
+                                  file_format: PurchasesExportFormatEnum) -> AsyncIterator[str]:
+        """
+        Serializes every batch of purchases into one chunk of CSV or NDJSON
+        :param batches:
+        :param file_format:
+        :return:
+        """
+        if file_format == PurchasesExportFormatEnum.CSV:
+            yield ",".join(PURCHASES_EXPORT_COLUMNS) + "\r\n"
+        async for rows in batches:
+            records = [(row.id, row.created_time.isoformat() if row.created_time else None, row.product_id,
+                        row.product_name, row.quantity, to_dollars(row.total_spent_cents), row.deposit_id) for row in rows]
+            if file_format == PurchasesExportFormatEnum.CSV:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(records)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(dict(zip(PURCHASES_EXPORT_COLUMNS, record))) + "\n" for record in records)
@@ -0,0 +1,109 @@
+"""
+Micro-benchmarks of the CPU-bound code run by every request, with realistic payload sizes.
+"""
+import asyncio
+from datetime import timedelta
+
+import jwt
+import pytest
+from pydantic import parse_obj_as
+
+from app.core.change import change_maker
+from app.core.constants import ALGORITHM, SECRET_KEY
+from app.db.utils import model_to_dict
+from app.models.products import Products
+from app.schemas.deposits import DepositsResponse
+from app.schemas.purchases import PurchaseInCreate, PurchaseResponse
+from app.schemas.users import UserInCreate
+from app.services.deposits import DepositsService
+from app.services.purchases import PurchasesService
+from app.services.users import UserService
+
+DEPOSIT_COINS = [{"value": 5, "quantity": 10}, {"value": 10, "quantity": 5}, {"value": 20, "quantity": 3},
+                 {"value": 50, "quantity": 2}, {"value": 100, "quantity": 4}]
+COIN_SUPPLY = {5: 200, 10: 200, 20: 200, 50: 100, 100: 100}
+
+
+def get_products(count: int) -> list:
+    products = []
+    for index in range(1, count + 1):
+        product = Products(name=f"product-{index}", price_cents=25 + 5 * index, quantity=1000, creator_id=1)
+        product.id, product.is_active = index, True
+        products.append(product)
+    return products
+
+
+def get_purchase(count: int) -> dict:
+    return {"products": [{"product_id": index, "quantity": 1 + index % 3} for index in range(1, count + 1)]}
+
+
+class ProductsRepositoryStub:
+    """
+    Returns the given products without a database round trip.
+    """
+
+    def __init__(self, products: list) -> None:
+        self.products = products
+
+    async def get_active_products_by_product_ids(self, product_ids: list, lock: bool = False) -> list:
+        return self.products
+
+
+@pytest.mark.parametrize("product_count", [1, 5, 50])
+def bench_handle_products(benchmark, product_count):
+    service = PurchasesService(purchases_repo=None, products_repo=ProductsRepositoryStub(get_products(product_count)),
+                               deposits_repo=None, sales_repo=None, coins_repo=None)
+    purchase = PurchaseInCreate.model_validate(get_purchase(product_count))
+    loop = asyncio.new_event_loop()
+    try:
+        benchmark(lambda: loop.run_until_complete(service.handle_products(purchase.products, 10 ** 9)))
+    finally:
+        loop.close()
+
+
+@pytest.mark.parametrize("amount_cents", [95, 1985, 9995])
+def bench_make_change(benchmark, amount_cents):
+    assert benchmark(change_maker.make_change, amount_cents, COIN_SUPPLY) is not None
+
+
+def bench_get_total_deposit_amount(benchmark):
+    coin_quantities = DepositsService.get_coin_quantities(DepositsResponse.model_validate(
+        {"coins": DEPOSIT_COINS, "total_deposit_amount": 0}).coins)
+    assert benchmark(DepositsService.get_total_deposit_amount, coin_quantities) == 660
+
+
+def bench_model_to_dict(benchmark):
+    product = get_products(1)[0]
+    assert benchmark(model_to_dict, product)["name"] == "product-1"
+
+
+def bench_parse_deposits_response(benchmark):
+    payload = {"coins": DEPOSIT_COINS, "total_deposit_amount": 6.6}
+    benchmark(parse_obj_as, DepositsResponse, payload)
+
+
+@pytest.mark.parametrize("product_count", [5, 50])
+def bench_parse_purchase_response(benchmark, product_count):
+    payload = {**get_purchase(product_count), "total_spent": 12.5,
+               "change": [{"value": 50, "quantity": 1}, {"value": 20, "quantity": 2}]}
+    benchmark(parse_obj_as, PurchaseResponse, payload)
+
+
+def bench_validate_user_in_create(benchmark):
+    payload = {"username": "buyer1", "email": "buyer1@example.com", "full_name": "Buyer One",
+               "roles": ["buyer", "seller"], "password": "password"}
+    benchmark(UserInCreate.model_validate, payload)
+
+
+@pytest.mark.parametrize("product_count", [5, 50])
+def bench_validate_purchase_in_create(benchmark, product_count):
+    benchmark(PurchaseInCreate.model_validate, get_purchase(product_count))
+
+
+def bench_create_access_token(benchmark):
+    benchmark(UserService.create_access_token, {"sub": "buyer1"}, timedelta(minutes=30))
+
+
+def bench_decode_access_token(benchmark):
+    token = UserService.create_access_token({"sub": "buyer1"}, timedelta(minutes=30))
+    assert benchmark(jwt.decode, token, SECRET_KEY, algorithms=[ALGORITHM])["sub"] == "buyer1"
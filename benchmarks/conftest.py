@@ -0,0 +1,6 @@
+import os
+
+# Application settings required at import time, the benchmarks don't use the database.
+# Only loaded by `python -m pytest benchmarks`, the root pytest.ini doesn't collect this directory
+for setting in ("SECRET_KEY", "DATABASE_URL", "POSTGRES_PORT", "POSTGRES_DB", "POSTGRES_USER", "POSTGRES_PASSWORD"):
+    os.environ.setdefault(setting, "sqlite://" if setting == "DATABASE_URL" else "benchmark")